@@ -7,19 +7,17 @@ import os
 from pathlib import Path
 from logging.config import fileConfig
 
-# Load environment variables from .env file (for local development)
-from dotenv import load_dotenv
-env_path = Path(__file__).parent.parent / ".env"
-if env_path.exists():
-    load_dotenv(env_path)
+# Load environment variables from .env file (for local development).
+# Skipped when DATABASE_URL is already set, e.g. in CI and deployed containers.
+if "DATABASE_URL" not in os.environ:
+    from dotenv import load_dotenv
+    env_path = Path(__file__).parent.parent / ".env"
+    if env_path.exists():
+        load_dotenv(env_path)
 
 from sqlalchemy import engine_from_config, pool
 from alembic import context
 
-# Import your models and Base - this populates Base.metadata
-from database import Base
-import models  # noqa: F401 - Import to register all models with Base.metadata
-
 # Alembic Config object - provides access to alembic.ini values
 config = context.config
 
@@ -27,8 +25,42 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+
+def load_target_metadata():
+    """Return the models' metadata, importing them only when it will be used.
+
+    Only autogenerate (`alembic revision --autogenerate`) and `alembic check`
+    compare against target_metadata; upgrade/downgrade/stamp never read it,
+    so the CLI skips the models import and mapper setup for those commands.
+    Programmatic callers (main.py) pass no cmd_opts and already have the
+    models imported, so the import below is free for them.
+    """
+    cmd_opts = config.cmd_opts
+    if cmd_opts is not None:
+        command_fn = getattr(cmd_opts, "cmd", (None,))[0]
+        compares_models = (
+            getattr(cmd_opts, "autogenerate", False)
+            or getattr(command_fn, "__name__", None) == "check"
+        )
+        if not compares_models:
+            return None
+
+    # Import your models and Base - this populates Base.metadata
+    from database import Base
+    import models  # noqa: F401 - Import to register all models with Base.metadata
+    return Base.metadata
+
+
 # Set target metadata from your models for autogenerate support
-target_metadata = Base.metadata
+target_metadata = load_target_metadata()
+
+# Tables written by migrations for forensic purposes only; not part of the models
+MIGRATION_ONLY_TABLES = {"migration_003_audit"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Keep migration-only tables out of autogenerate / `alembic check`."""
+    return not (type_ == "table" and name in MIGRATION_ONLY_TABLES)
 
 
 def get_url() -> str:
@@ -56,6 +88,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
@@ -75,16 +108,21 @@ def run_migrations_online() -> None:
     configuration = config.get_section(config.config_ini_section, {})
     configuration["sqlalchemy.url"] = get_url()
 
+    # A single warm pooled connection instead of NullPool's connect-per-checkout
     connectable = engine_from_config(
         configuration,
         prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
+        poolclass=pool.QueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_pre_ping=False,
     )
 
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
+            include_object=include_object,
             compare_type=True,
             compare_server_default=True,
         )
@@ -92,6 +130,9 @@ def run_migrations_online() -> None:
         with context.begin_transaction():
             context.run_migrations()
 
+    # Release the pooled connection; main.py runs migrations in-process
+    connectable.dispose()
+
 
 if context.is_offline_mode():
     run_migrations_offline()
@@ -25,22 +25,50 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Add quote_sequence column and populate existing quotes."""
+    conn = op.get_bind()
+
+    # Session tuning for the backfill; SET LOCAL reverts at commit. work_mem
+    # keeps the ROW_NUMBER() sort in memory instead of spilling to temp files
+    if conn.dialect.name == 'postgresql':
+        conn.execute(sa.text("SET LOCAL synchronous_commit = off"))
+        conn.execute(sa.text("SET LOCAL work_mem = '256MB'"))
+        conn.execute(sa.text("SET LOCAL maintenance_work_mem = '512MB'"))
 
     # 1. Add column as nullable first (allows us to populate existing rows)
     op.add_column('quotes', sa.Column('quote_sequence', sa.Integer(), nullable=True))
 
-    # 2. Populate existing quotes with sequence numbers based on creation order within each project
-    # Uses ROW_NUMBER() window function to assign 1, 2, 3... per project ordered by created_at
-    op.execute("""
-        UPDATE quotes
-        SET quote_sequence = subquery.seq
-        FROM (
-            SELECT id,
-                   ROW_NUMBER() OVER (PARTITION BY project_id ORDER BY created_at ASC, id ASC) as seq
-            FROM quotes
-        ) AS subquery
-        WHERE quotes.id = subquery.id
-    """)
+    # 2. Populate existing quotes (skipped on a fresh database with no quotes)
+    has_quotes = conn.execute(sa.text("SELECT 1 FROM quotes LIMIT 1")).first() is not None
+    if has_quotes:
+        # Temporary index covering the window's partition + order keys, so the
+        # backfill reads quotes in order instead of sorting the whole table.
+        # (CONCURRENTLY is not allowed inside the migration transaction.)
+        conn.execute(sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_quotes_seq_backfill ON quotes (project_id, created_at, id)"
+        ))
+
+        # Assign sequence numbers based on creation order within each project
+        # Uses ROW_NUMBER() window function to assign 1, 2, 3... per project ordered by created_at.
+        # The explicit ROWS frame skips peer-row checks, and IS DISTINCT FROM leaves rows that
+        # already hold the right value untouched if the backfill is re-run.
+        conn.execute(sa.text("""
+            WITH seqs AS (
+                SELECT id,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY project_id
+                           ORDER BY created_at ASC, id ASC
+                           ROWS UNBOUNDED PRECEDING
+                       ) AS seq
+                FROM quotes
+            )
+            UPDATE quotes
+            SET quote_sequence = seqs.seq
+            FROM seqs
+            WHERE quotes.id = seqs.id
+              AND quotes.quote_sequence IS DISTINCT FROM seqs.seq
+        """))
+
+        conn.execute(sa.text("DROP INDEX IF EXISTS ix_quotes_seq_backfill"))
 
     # 3. Make column non-nullable now that all rows have values
     op.alter_column('quotes', 'quote_sequence', nullable=False)
@@ -11,9 +11,13 @@ Tables modified:
 - quote_line_item_snapshots: quantity, qty_pending, qty_fulfilled
 
 Strategy:
-1. Round existing float values to nearest integer
-2. Convert column types from Float to Integer
-3. Log any values that were rounded (for audit purposes)
+1. Record any values that will be rounded in the migration_003_audit table
+2. Round existing float values to nearest integer
+3. Convert column types from Float to Integer
+
+On PostgreSQL steps 2 and 3 are fused: ALTER COLUMN ... TYPE INTEGER USING
+ROUND(col)::INTEGER rounds while it rewrites the table, and all of a table's
+columns go in one ALTER TABLE, so each table is rewritten exactly once.
 
 Note: SQLite requires table recreation for type changes, handled via batch operations.
 
@@ -22,6 +26,8 @@ Revises: 002_quote_sequence
 Create Date: 2026-02-03
 
 """
+import logging
+import os
 from typing import Sequence, Union
 
 from alembic import op
@@ -34,6 +40,96 @@ down_revision: Union[str, None] = '002_quote_sequence'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
+# Child of the 'alembic' logger, so alembic.ini's INFO level applies
+log = logging.getLogger("alembic.migration")
+
+
+# Quantity columns converted by this migration, per table
+QUANTITY_COLUMNS = {
+    'labor': ('hours',),
+    'quote_line_items': ('quantity', 'qty_pending', 'qty_fulfilled'),
+    'po_line_items': ('quantity',),
+    'invoice_line_items': ('qty_ordered', 'qty_fulfilled_this_invoice',
+                           'qty_fulfilled_total', 'qty_pending_after'),
+    'quote_line_item_snapshots': ('quantity', 'qty_pending', 'qty_fulfilled'),
+}
+
+# Server defaults restated as integer literals once the columns are Integer
+INTEGER_SERVER_DEFAULTS = {
+    ('labor', 'hours'): '1',
+    ('quote_line_items', 'quantity'): '1',
+    ('quote_line_items', 'qty_pending'): '0',
+    ('quote_line_items', 'qty_fulfilled'): '0',
+    ('po_line_items', 'quantity'): '1',
+}
+
+AUDIT_TABLE = 'migration_003_audit'
+# Optional CSV copy of the audit table; set to a file path to enable it
+AUDIT_EXPORT_ENV = 'MIGRATION_003_AUDIT_EXPORT'
+
+# Lightweight table constructs for the columns this migration reads and writes
+QUANTITY_TABLES = {
+    table: sa.table(table, sa.column('id'), sa.column('description'), *(sa.column(col) for col in columns))
+    for table, columns in QUANTITY_COLUMNS.items()
+}
+
+# "Any quantity column is fractional" per table. Built once and shared by the
+# audit probe, the audit INSERT and the rounding UPDATE.
+FRACTIONAL_PREDICATES = {
+    table: sa.or_(*(
+        QUANTITY_TABLES[table].c[col] != sa.func.round(QUANTITY_TABLES[table].c[col])
+        for col in columns
+    ))
+    for table, columns in QUANTITY_COLUMNS.items()
+}
+
+audit_table = sa.table(AUDIT_TABLE, sa.column('table_name'), sa.column('row_id'), sa.column('details'))
+
+
+def _audit_details(columns):
+    """SQL expression listing only the fractional columns as 'col=old -> rounded'.
+
+    Each column contributes ', col=old -> rounded' when it changes and '' otherwise;
+    SUBSTR drops the leading separator. All formatting happens server-side.
+    """
+    parts = [
+        f"CASE WHEN {col} != ROUND({col}) "
+        f"THEN ', {col}=' || CAST({col} AS VARCHAR) || ' -> ' || CAST(ROUND({col}) AS VARCHAR) "
+        f"ELSE '' END"
+        for col in columns
+    ]
+    return "'''' || COALESCE(description, '') || ''': ' || SUBSTR(" + " || ".join(parts) + ", 3)"
+
+
+def _export_audit(conn, path):
+    """Best-effort CSV dump of the audit table via COPY ... TO STDOUT.
+
+    Runs inside a SAVEPOINT so a failed export can't abort the migration;
+    the audit table itself remains the record either way.
+    """
+    copy_sql = (
+        f"COPY (SELECT table_name, row_id, details FROM {AUDIT_TABLE} "
+        f"ORDER BY table_name, row_id) TO STDOUT WITH CSV HEADER"
+    )
+    try:
+        with conn.begin_nested(), open(path, 'wb') as export_file:
+            cursor = conn.connection.dbapi_connection.cursor()
+            try:
+                if hasattr(cursor, 'copy'):
+                    # psycopg 3
+                    with cursor.copy(copy_sql) as copy:
+                        for block in copy:
+                            export_file.write(block)
+                else:
+                    # psycopg2
+                    cursor.copy_expert(copy_sql, export_file)
+            finally:
+                cursor.close()
+    except Exception as exc:
+        log.warning(f"[AUDIT] Could not export {AUDIT_TABLE} to {path}: {exc}")
+    else:
+        log.info(f"[AUDIT] Exported {AUDIT_TABLE} to {path}")
+
 
 def upgrade() -> None:
     """Convert quantity columns from Float to Integer with rounding."""
@@ -41,185 +137,177 @@ def upgrade() -> None:
     # Get connection for raw SQL operations
     conn = op.get_bind()
 
-    # ===== STEP 1: Log fractional values before rounding (for audit) =====
-
-    # Check for fractional values in labor.hours
-    result = conn.execute(sa.text("""
-        SELECT id, description, hours
-        FROM labor
-        WHERE hours != ROUND(hours)
-    """))
-    fractional_labor = result.fetchall()
-    if fractional_labor:
-        print(f"[AUDIT] Found {len(fractional_labor)} labor items with fractional hours:")
-        for row in fractional_labor:
-            print(f"  - Labor ID {row[0]} '{row[1]}': {row[2]} -> {round(row[2])}")
-
-    # Check for fractional values in quote_line_items
-    result = conn.execute(sa.text("""
-        SELECT id, description, quantity, qty_pending, qty_fulfilled
-        FROM quote_line_items
-        WHERE quantity != ROUND(quantity)
-           OR qty_pending != ROUND(qty_pending)
-           OR qty_fulfilled != ROUND(qty_fulfilled)
-    """))
-    fractional_qli = result.fetchall()
-    if fractional_qli:
-        print(f"[AUDIT] Found {len(fractional_qli)} quote line items with fractional quantities:")
-        for row in fractional_qli:
-            print(f"  - QLI ID {row[0]} '{row[1]}': qty={row[2]}, pending={row[3]}, fulfilled={row[4]}")
-
-    # Check for fractional values in po_line_items
-    result = conn.execute(sa.text("""
-        SELECT id, description, quantity
-        FROM po_line_items
-        WHERE quantity != ROUND(quantity)
-    """))
-    fractional_poli = result.fetchall()
-    if fractional_poli:
-        print(f"[AUDIT] Found {len(fractional_poli)} PO line items with fractional quantities:")
-        for row in fractional_poli:
-            print(f"  - PO Line Item ID {row[0]} '{row[1]}': {row[2]} -> {round(row[2])}")
-
-    # Check for fractional values in invoice_line_items
-    result = conn.execute(sa.text("""
-        SELECT id, description, qty_ordered, qty_fulfilled_this_invoice, qty_fulfilled_total, qty_pending_after
-        FROM invoice_line_items
-        WHERE qty_ordered != ROUND(qty_ordered)
-           OR qty_fulfilled_this_invoice != ROUND(qty_fulfilled_this_invoice)
-           OR qty_fulfilled_total != ROUND(qty_fulfilled_total)
-           OR qty_pending_after != ROUND(qty_pending_after)
-    """))
-    fractional_ili = result.fetchall()
-    if fractional_ili:
-        print(f"[AUDIT] Found {len(fractional_ili)} invoice line items with fractional quantities:")
-        for row in fractional_ili:
-            print(f"  - ILI ID {row[0]} '{row[1]}': ordered={row[2]}, this_invoice={row[3]}, total={row[4]}, pending_after={row[5]}")
-
-    # Check for fractional values in quote_line_item_snapshots
-    result = conn.execute(sa.text("""
-        SELECT id, description, quantity, qty_pending, qty_fulfilled
-        FROM quote_line_item_snapshots
-        WHERE quantity != ROUND(quantity)
-           OR qty_pending != ROUND(qty_pending)
-           OR qty_fulfilled != ROUND(qty_fulfilled)
-    """))
-    fractional_qlis = result.fetchall()
-    if fractional_qlis:
-        print(f"[AUDIT] Found {len(fractional_qlis)} snapshot line items with fractional quantities:")
-        for row in fractional_qlis:
-            print(f"  - Snapshot LI ID {row[0]} '{row[1]}': qty={row[2]}, pending={row[3]}, fulfilled={row[4]}")
+    # Session tuning for the bulk rewrite; SET LOCAL reverts at commit, and the
+    # migration commits or rolls back as a whole so per-statement fsync is moot
+    if conn.dialect.name == 'postgresql':
+        conn.execute(sa.text("SET LOCAL synchronous_commit = off"))
+        conn.execute(sa.text("SET LOCAL work_mem = '256MB'"))
+        conn.execute(sa.text("SET LOCAL maintenance_work_mem = '512MB'"))
+
+    # ===== STEP 1: Record fractional values before rounding (for audit) =====
+    # One EXISTS probe decides whether any table holds fractional values. The
+    # forensic record is written set-based into AUDIT_TABLE inside the database
+    # rather than fetched into Python and printed row by row.
+
+    has_fractional = conn.execute(sa.select(sa.or_(*(
+        sa.select(QUANTITY_TABLES[table].c.id).where(FRACTIONAL_PREDICATES[table]).exists()
+        for table in QUANTITY_COLUMNS
+    )))).scalar()
+
+    if has_fractional:
+        conn.execute(sa.text(f"""
+            CREATE TABLE IF NOT EXISTS {AUDIT_TABLE} (
+                table_name VARCHAR NOT NULL,
+                row_id INTEGER NOT NULL,
+                details VARCHAR,
+                captured_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        for table, columns in QUANTITY_COLUMNS.items():
+            conn.execute(sa.insert(audit_table).from_select(
+                ['table_name', 'row_id', 'details'],
+                sa.select(
+                    sa.literal(table),
+                    QUANTITY_TABLES[table].c.id,
+                    sa.literal_column(_audit_details(columns)),
+                ).where(FRACTIONAL_PREDICATES[table]),
+            ))
+
+        result = conn.execute(sa.text(
+            f"SELECT table_name, COUNT(*) FROM {AUDIT_TABLE} GROUP BY table_name"
+        ))
+        for table, count in result:
+            log.info(f"[AUDIT] {count} {table} rows with fractional quantities recorded in {AUDIT_TABLE}")
+
+        export_path = os.getenv(AUDIT_EXPORT_ENV)
+        if export_path and conn.dialect.name == 'postgresql':
+            _export_audit(conn, export_path)
+    else:
+        log.info("[AUDIT] No fractional quantities found")
+
+    is_postgres = conn.dialect.name == 'postgresql'
 
     # ===== STEP 2: Round values first (while columns are still Float) =====
-
-    # Round labor hours
-    conn.execute(sa.text("UPDATE labor SET hours = ROUND(hours)"))
-
-    # Round quote_line_items quantities
-    conn.execute(sa.text("""
-        UPDATE quote_line_items
-        SET quantity = ROUND(quantity),
-            qty_pending = ROUND(qty_pending),
-            qty_fulfilled = ROUND(qty_fulfilled)
-    """))
-
-    # Round po_line_items quantities
-    conn.execute(sa.text("UPDATE po_line_items SET quantity = ROUND(quantity)"))
-
-    # Round invoice_line_items quantities
-    conn.execute(sa.text("""
-        UPDATE invoice_line_items
-        SET qty_ordered = ROUND(qty_ordered),
-            qty_fulfilled_this_invoice = ROUND(qty_fulfilled_this_invoice),
-            qty_fulfilled_total = ROUND(qty_fulfilled_total),
-            qty_pending_after = ROUND(qty_pending_after)
-    """))
-
-    # Round quote_line_item_snapshots quantities
-    conn.execute(sa.text("""
-        UPDATE quote_line_item_snapshots
-        SET quantity = ROUND(quantity),
-            qty_pending = ROUND(qty_pending),
-            qty_fulfilled = ROUND(qty_fulfilled)
-    """))
+    # PostgreSQL rounds during the type change itself (Step 3), so this pass
+    # only runs elsewhere, and only when the Step 1 probe found something to
+    # round. It is still required on SQLite: batch mode copies rows with
+    # CAST(col AS INTEGER), which truncates instead of rounding.
+
+    if has_fractional and not is_postgres:
+        for table, columns in QUANTITY_COLUMNS.items():
+            quantity_table = QUANTITY_TABLES[table]
+            conn.execute(
+                sa.update(quantity_table)
+                .where(FRACTIONAL_PREDICATES[table])
+                .values({col: sa.func.round(quantity_table.c[col]) for col in columns})
+            )
 
     # ===== STEP 3: Convert column types to Integer =====
-    # SQLite requires batch operations to change column types
 
-    # Convert labor.hours
-    with op.batch_alter_table('labor', schema=None) as batch_op:
-        batch_op.alter_column('hours',
-                              existing_type=sa.Float(),
-                              type_=sa.Integer(),
-                              existing_nullable=False,
-                              existing_server_default=sa.text('1.0'))
-
-    # Convert quote_line_items columns
-    with op.batch_alter_table('quote_line_items', schema=None) as batch_op:
-        batch_op.alter_column('quantity',
-                              existing_type=sa.Float(),
-                              type_=sa.Integer(),
-                              existing_nullable=True,
-                              existing_server_default=sa.text('1.0'))
-        batch_op.alter_column('qty_pending',
-                              existing_type=sa.Float(),
-                              type_=sa.Integer(),
-                              existing_nullable=True,
-                              existing_server_default=sa.text('0.0'))
-        batch_op.alter_column('qty_fulfilled',
-                              existing_type=sa.Float(),
-                              type_=sa.Integer(),
-                              existing_nullable=True,
-                              existing_server_default=sa.text('0.0'))
-
-    # Convert po_line_items.quantity
-    with op.batch_alter_table('po_line_items', schema=None) as batch_op:
-        batch_op.alter_column('quantity',
-                              existing_type=sa.Float(),
-                              type_=sa.Integer(),
-                              existing_nullable=True,
-                              existing_server_default=sa.text('1.0'))
-
-    # Convert invoice_line_items columns
-    with op.batch_alter_table('invoice_line_items', schema=None) as batch_op:
-        batch_op.alter_column('qty_ordered',
-                              existing_type=sa.Float(),
-                              type_=sa.Integer(),
-                              existing_nullable=True)
-        batch_op.alter_column('qty_fulfilled_this_invoice',
-                              existing_type=sa.Float(),
-                              type_=sa.Integer(),
-                              existing_nullable=True)
-        batch_op.alter_column('qty_fulfilled_total',
-                              existing_type=sa.Float(),
-                              type_=sa.Integer(),
-                              existing_nullable=True)
-        batch_op.alter_column('qty_pending_after',
-                              existing_type=sa.Float(),
-                              type_=sa.Integer(),
-                              existing_nullable=True)
-
-    # Convert quote_line_item_snapshots columns
-    with op.batch_alter_table('quote_line_item_snapshots', schema=None) as batch_op:
-        batch_op.alter_column('quantity',
-                              existing_type=sa.Float(),
-                              type_=sa.Integer(),
-                              existing_nullable=True)
-        batch_op.alter_column('qty_pending',
-                              existing_type=sa.Float(),
-                              type_=sa.Integer(),
-                              existing_nullable=True)
-        batch_op.alter_column('qty_fulfilled',
-                              existing_type=sa.Float(),
-                              type_=sa.Integer(),
-                              existing_nullable=True)
-
-    print("[SUCCESS] All quantity columns converted to Integer type")
+    if is_postgres:
+        # ALTER TYPE ... USING fuses rounding and retyping, and listing every
+        # column in one ALTER TABLE makes it a single rewrite per table. The
+        # integer default is set in the same statement.
+        for table, columns in QUANTITY_COLUMNS.items():
+            clauses = []
+            for col in columns:
+                clauses.append(f"ALTER COLUMN {col} TYPE INTEGER USING ROUND({col})::INTEGER")
+                if (table, col) in INTEGER_SERVER_DEFAULTS:
+                    clauses.append(f"ALTER COLUMN {col} SET DEFAULT {INTEGER_SERVER_DEFAULTS[(table, col)]}")
+            conn.execute(sa.text(f"ALTER TABLE {table} " + ", ".join(clauses)))
+    else:
+        # SQLite requires batch operations to change column types. The five
+        # tables are reflected in one pass and handed to batch mode via
+        # copy_from, so each batch skips its own reflection round trip.
+        reflected = sa.MetaData()
+        reflected.reflect(conn, only=list(QUANTITY_COLUMNS))
+
+        # Convert labor.hours
+        with op.batch_alter_table('labor', schema=None,
+                                  copy_from=reflected.tables['labor']) as batch_op:
+            batch_op.alter_column('hours',
+                                  existing_type=sa.Float(),
+                                  type_=sa.Integer(),
+                                  existing_nullable=False,
+                                  existing_server_default=sa.text('1.0'),
+                                  server_default=sa.text('1'))
+
+        # Convert quote_line_items columns
+        with op.batch_alter_table('quote_line_items', schema=None,
+                                  copy_from=reflected.tables['quote_line_items']) as batch_op:
+            batch_op.alter_column('quantity',
+                                  existing_type=sa.Float(),
+                                  type_=sa.Integer(),
+                                  existing_nullable=True,
+                                  existing_server_default=sa.text('1.0'),
+                                  server_default=sa.text('1'))
+            batch_op.alter_column('qty_pending',
+                                  existing_type=sa.Float(),
+                                  type_=sa.Integer(),
+                                  existing_nullable=True,
+                                  existing_server_default=sa.text('0.0'),
+                                  server_default=sa.text('0'))
+            batch_op.alter_column('qty_fulfilled',
+                                  existing_type=sa.Float(),
+                                  type_=sa.Integer(),
+                                  existing_nullable=True,
+                                  existing_server_default=sa.text('0.0'),
+                                  server_default=sa.text('0'))
+
+        # Convert po_line_items.quantity
+        with op.batch_alter_table('po_line_items', schema=None,
+                                  copy_from=reflected.tables['po_line_items']) as batch_op:
+            batch_op.alter_column('quantity',
+                                  existing_type=sa.Float(),
+                                  type_=sa.Integer(),
+                                  existing_nullable=True,
+                                  existing_server_default=sa.text('1.0'),
+                                  server_default=sa.text('1'))
+
+        # Convert invoice_line_items columns
+        with op.batch_alter_table('invoice_line_items', schema=None,
+                                  copy_from=reflected.tables['invoice_line_items']) as batch_op:
+            batch_op.alter_column('qty_ordered',
+                                  existing_type=sa.Float(),
+                                  type_=sa.Integer(),
+                                  existing_nullable=True)
+            batch_op.alter_column('qty_fulfilled_this_invoice',
+                                  existing_type=sa.Float(),
+                                  type_=sa.Integer(),
+                                  existing_nullable=True)
+            batch_op.alter_column('qty_fulfilled_total',
+                                  existing_type=sa.Float(),
+                                  type_=sa.Integer(),
+                                  existing_nullable=True)
+            batch_op.alter_column('qty_pending_after',
+                                  existing_type=sa.Float(),
+                                  type_=sa.Integer(),
+                                  existing_nullable=True)
+
+        # Convert quote_line_item_snapshots columns
+        with op.batch_alter_table('quote_line_item_snapshots', schema=None,
+                                  copy_from=reflected.tables['quote_line_item_snapshots']) as batch_op:
+            batch_op.alter_column('quantity',
+                                  existing_type=sa.Float(),
+                                  type_=sa.Integer(),
+                                  existing_nullable=True)
+            batch_op.alter_column('qty_pending',
+                                  existing_type=sa.Float(),
+                                  type_=sa.Integer(),
+                                  existing_nullable=True)
+            batch_op.alter_column('qty_fulfilled',
+                                  existing_type=sa.Float(),
+                                  type_=sa.Integer(),
+                                  existing_nullable=True)
+
+    log.info("[SUCCESS] All quantity columns converted to Integer type")
 
 
 def downgrade() -> None:
     """Revert Integer columns back to Float."""
 
+    op.execute(f"DROP TABLE IF EXISTS {AUDIT_TABLE}")
+
     # Convert labor.hours back to Float
     with op.batch_alter_table('labor', schema=None) as batch_op:
         batch_op.alter_column('hours',
@@ -283,4 +371,4 @@ def downgrade() -> None:
                               type_=sa.Float(),
                               existing_nullable=True)
 
-    print("[REVERTED] All quantity columns converted back to Float type")
+    log.info("[REVERTED] All quantity columns converted back to Float type")
@@ -10,6 +10,8 @@ Revision ID: 005_receiving_fk
 Revises: 004_po_versioning
 Create Date: 2026-02-06
 """
+import logging
+
 from alembic import op
 import sqlalchemy as sa
 
@@ -20,17 +22,29 @@ down_revision = '004_po_versioning'
 branch_labels = None
 depends_on = None
 
+log = logging.getLogger("alembic.migration")
+
 
 def upgrade():
-    # Add foreign key constraint from po_receiving_line_items to po_line_items
-    op.create_foreign_key(
-        'fk_po_receiving_line_items_po_line_item_id',  # constraint name
-        'po_receiving_line_items',  # source table
-        'po_line_items',  # referent table
-        ['po_line_item_id'],  # source columns
-        ['id']  # referent columns
+    # Add foreign key constraint from po_receiving_line_items to po_line_items.
+    # NOT VALID skips the scan of existing rows under the ADD CONSTRAINT lock.
+    # The DO block tolerates a constraint left by an earlier, interrupted run.
+    op.execute(
+        "DO $$ BEGIN "
+        "ALTER TABLE po_receiving_line_items "
+        "ADD CONSTRAINT fk_po_receiving_line_items_po_line_item_id "
+        "FOREIGN KEY (po_line_item_id) REFERENCES po_line_items (id) NOT VALID; "
+        "EXCEPTION WHEN duplicate_object THEN NULL; "
+        "END $$"
     )
-    print("[MIGRATION] Added foreign key constraint from po_receiving_line_items.po_line_item_id to po_line_items.id")
+    # autocommit_block commits the ADD first, so VALIDATE runs in its own
+    # transaction under SHARE UPDATE EXCLUSIVE and writers are not blocked
+    with op.get_context().autocommit_block():
+        op.execute(
+            "ALTER TABLE po_receiving_line_items "
+            "VALIDATE CONSTRAINT fk_po_receiving_line_items_po_line_item_id"
+        )
+    log.info("[MIGRATION] Added foreign key constraint from po_receiving_line_items.po_line_item_id to po_line_items.id")
 
 
 def downgrade():
@@ -40,4 +54,4 @@ def downgrade():
         'po_receiving_line_items',
         type_='foreignkey'
     )
-    print("[ROLLBACK] Removed foreign key constraint fk_po_receiving_line_items_po_line_item_id")
+    log.info("[ROLLBACK] Removed foreign key constraint fk_po_receiving_line_items_po_line_item_id")
@@ -10,6 +10,8 @@ Revision ID: 006_fix_missing_po_columns
 Revises: 005_receiving_fk
 Create Date: 2026-02-07
 """
+import logging
+
 from alembic import op
 import sqlalchemy as sa
 
@@ -20,117 +22,179 @@ down_revision = '005_receiving_fk'
 branch_labels = None
 depends_on = None
 
+log = logging.getLogger("alembic.migration")
+
+
+def _ensure_constraint(conn, table_name, constraint_name, definition):
+    """Add a constraint unless it already exists, in a single statement.
+
+    Postgres has no ADD CONSTRAINT IF NOT EXISTS; the DO block swallows the
+    duplicate error instead of probing the catalog first. A duplicate UNIQUE
+    constraint surfaces as duplicate_table because of its backing index.
+    """
+    conn.execute(sa.text(
+        f"DO $$ BEGIN "
+        f"ALTER TABLE {table_name} ADD CONSTRAINT {constraint_name} {definition}; "
+        f"EXCEPTION WHEN duplicate_object OR duplicate_table THEN NULL; "
+        f"END $$"
+    ))
+
 
 def upgrade():
     conn = op.get_bind()
 
+    # One catalog lookup answers every question in this migration
+    state = conn.execute(sa.text(
+        "SELECT "
+        "(SELECT count(*) FROM pg_attribute "
+        " WHERE attrelid = 'purchase_orders'::regclass AND NOT attisdropped AND attname IN "
+        " ('po_sequence', 'current_version', 'work_description', 'vendor_po_number', "
+        "  'expected_delivery_date')) = 5 AS has_po_columns, "
+        "(SELECT count(*) FROM pg_attribute "
+        " WHERE attrelid = 'po_line_items'::regclass AND NOT attisdropped AND attname IN "
+        " ('qty_pending', 'qty_received', 'actual_unit_price')) = 3 AS has_line_item_columns, "
+        "EXISTS (SELECT 1 FROM pg_type WHERE typname = 'postatus') AS has_enum, "
+        "(SELECT atttypid::regtype::text FROM pg_attribute "
+        " WHERE attrelid = 'purchase_orders'::regclass AND attname = 'status' "
+        " AND NOT attisdropped) AS status_type, "
+        "(SELECT attnotnull FROM pg_attribute "
+        " WHERE attrelid = 'purchase_orders'::regclass AND attname = 'po_sequence' "
+        " AND NOT attisdropped) AS seq_notnull, "
+        "EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_po_project_sequence') AS has_uq, "
+        "EXISTS (SELECT 1 FROM pg_constraint "
+        " WHERE conname = 'fk_po_snapshots_receiving_id' AND convalidated) AS has_fk1, "
+        "EXISTS (SELECT 1 FROM pg_constraint "
+        " WHERE conname = 'fk_po_receiving_line_items_po_line_item_id' AND convalidated) AS has_fk2"
+    )).one()
+
+    # A database where 004 ran to completion needs nothing from this migration
+    if (state.has_po_columns and state.has_line_item_columns and state.has_enum
+            and state.status_type == 'postatus' and state.seq_notnull
+            and state.has_uq and state.has_fk1 and state.has_fk2):
+        log.info("[006] fast-path: schema already correct")
+        return
+
     # ── purchase_orders: ensure all PO versioning columns exist ──
-    conn.execute(sa.text("ALTER TABLE purchase_orders ADD COLUMN IF NOT EXISTS po_sequence INTEGER"))
-    conn.execute(sa.text("ALTER TABLE purchase_orders ADD COLUMN IF NOT EXISTS current_version INTEGER DEFAULT 0 NOT NULL"))
-    conn.execute(sa.text("ALTER TABLE purchase_orders ADD COLUMN IF NOT EXISTS work_description VARCHAR"))
-    conn.execute(sa.text("ALTER TABLE purchase_orders ADD COLUMN IF NOT EXISTS vendor_po_number VARCHAR"))
-    conn.execute(sa.text("ALTER TABLE purchase_orders ADD COLUMN IF NOT EXISTS expected_delivery_date TIMESTAMP"))
-    print("[006] purchase_orders columns ensured")
+    # One multi-clause ALTER: a single lock acquisition and catalog update
+    if not state.has_po_columns:
+        conn.execute(sa.text(
+            "ALTER TABLE purchase_orders "
+            "ADD COLUMN IF NOT EXISTS po_sequence INTEGER, "
+            "ADD COLUMN IF NOT EXISTS current_version INTEGER DEFAULT 0 NOT NULL, "
+            "ADD COLUMN IF NOT EXISTS work_description VARCHAR, "
+            "ADD COLUMN IF NOT EXISTS vendor_po_number VARCHAR, "
+            "ADD COLUMN IF NOT EXISTS expected_delivery_date TIMESTAMP"
+        ))
+    log.info("[006] purchase_orders columns ensured")
 
     # ── po_line_items: ensure fulfillment tracking columns exist ──
-    conn.execute(sa.text("ALTER TABLE po_line_items ADD COLUMN IF NOT EXISTS qty_pending INTEGER DEFAULT 0 NOT NULL"))
-    conn.execute(sa.text("ALTER TABLE po_line_items ADD COLUMN IF NOT EXISTS qty_received INTEGER DEFAULT 0 NOT NULL"))
-    conn.execute(sa.text("ALTER TABLE po_line_items ADD COLUMN IF NOT EXISTS actual_unit_price FLOAT"))
-    print("[006] po_line_items columns ensured")
+    # Since PG 11 a constant DEFAULT is stored in the catalog and NOT NULL is
+    # satisfied by it, so these adds never rewrite or scan the table. Adding
+    # nullable + backfill + CHECK NOT VALID would only add work.
+    if not state.has_line_item_columns:
+        conn.execute(sa.text(
+            "ALTER TABLE po_line_items "
+            "ADD COLUMN IF NOT EXISTS qty_pending INTEGER DEFAULT 0 NOT NULL, "
+            "ADD COLUMN IF NOT EXISTS qty_received INTEGER DEFAULT 0 NOT NULL, "
+            "ADD COLUMN IF NOT EXISTS actual_unit_price FLOAT"
+        ))
+    log.info("[006] po_line_items columns ensured")
 
-    # ── POStatus enum: ensure it exists ──
     # ── POStatus enum: ensure it exists (lowercase values match SQLAlchemy member names) ──
-    postatus_enum = sa.Enum('draft', 'sent', 'received', 'closed', name='postatus', create_type=True)
-    postatus_enum.create(conn, checkfirst=True)
+    if not state.has_enum:
+        postatus_enum = sa.Enum('draft', 'sent', 'received', 'closed', name='postatus', create_type=True)
+        postatus_enum.create(conn, checkfirst=False)
+        log.info("[006] Created POStatus enum")
 
     # ── purchase_orders.status: ensure it uses the enum type ──
-    result = conn.execute(sa.text(
-        "SELECT data_type, udt_name FROM information_schema.columns "
-        "WHERE table_name = 'purchase_orders' AND column_name = 'status'"
-    ))
-    row = result.fetchone()
-    if row and row[1] != 'postatus':
-        conn.execute(sa.text("UPDATE purchase_orders SET status = lower(status)"))
-        conn.execute(sa.text(
-            "ALTER TABLE purchase_orders "
-            "ALTER COLUMN status TYPE postatus USING status::postatus"
-        ))
+    if state.status_type is not None and state.status_type != 'postatus':
         conn.execute(sa.text(
             "ALTER TABLE purchase_orders "
+            "ALTER COLUMN status DROP DEFAULT, "
+            "ALTER COLUMN status TYPE postatus USING lower(status)::postatus, "
             "ALTER COLUMN status SET DEFAULT 'draft'::postatus"
         ))
-        print("[006] purchase_orders.status converted to POStatus enum")
+        log.info("[006] purchase_orders.status converted to POStatus enum")
     else:
-        print("[006] purchase_orders.status already correct")
+        log.info("[006] purchase_orders.status already correct")
 
-    # ── po_sequence: ensure NOT NULL ──
-    result = conn.execute(sa.text(
-        "SELECT is_nullable FROM information_schema.columns "
-        "WHERE table_name = 'purchase_orders' AND column_name = 'po_sequence'"
-    ))
-    row = result.fetchone()
-    if row and row[0] == 'YES':
+    # ── po_sequence: ensure NOT NULL (None: the column was only just added) ──
+    if not state.seq_notnull:
         # Backfill any NULL po_sequence values before adding NOT NULL
-        conn.execute(sa.text(
-            "UPDATE purchase_orders SET po_sequence = id WHERE po_sequence IS NULL"
-        ))
-        conn.execute(sa.text(
+        conn.exec_driver_sql(
+            "UPDATE purchase_orders SET po_sequence = id WHERE po_sequence IS NULL; "
             "ALTER TABLE purchase_orders ALTER COLUMN po_sequence SET NOT NULL"
-        ))
-        print("[006] purchase_orders.po_sequence set to NOT NULL")
+        )
+        log.info("[006] purchase_orders.po_sequence set to NOT NULL")
     else:
-        print("[006] purchase_orders.po_sequence already NOT NULL")
+        log.info("[006] purchase_orders.po_sequence already NOT NULL")
 
     # ── Unique constraint on (project_id, po_sequence) ──
-    result = conn.execute(sa.text(
-        "SELECT EXISTS (SELECT FROM information_schema.table_constraints "
-        "WHERE constraint_name = 'uq_po_project_sequence')"
-    ))
-    if not result.scalar():
-        op.create_unique_constraint(
-            'uq_po_project_sequence',
-            'purchase_orders',
-            ['project_id', 'po_sequence']
+    if not state.has_uq:
+        # Build the backing index without blocking writes (CONCURRENTLY cannot
+        # run inside a transaction), then attach it; the attach renames it.
+        with op.get_context().autocommit_block():
+            # A failed or cancelled concurrent build leaves an INVALID index
+            # that IF NOT EXISTS would skip and ADD CONSTRAINT would reject
+            leftover_invalid = conn.execute(sa.text(
+                "SELECT NOT indisvalid FROM pg_index "
+                "WHERE indexrelid = to_regclass('uq_po_project_sequence_idx')"
+            )).scalar()
+            if leftover_invalid:
+                op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_po_project_sequence_idx")
+                log.info("[006] Dropped invalid uq_po_project_sequence_idx left by an earlier run")
+            op.execute(
+                "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_po_project_sequence_idx "
+                "ON purchase_orders (project_id, po_sequence)"
+            )
+        op.execute(
+            "ALTER TABLE purchase_orders ADD CONSTRAINT uq_po_project_sequence "
+            "UNIQUE USING INDEX uq_po_project_sequence_idx"
         )
-        print("[006] Created uq_po_project_sequence constraint")
+        log.info("[006] Created uq_po_project_sequence constraint")
     else:
-        print("[006] uq_po_project_sequence constraint already exists")
+        log.info("[006] uq_po_project_sequence constraint already exists")
 
     # ── FK from po_snapshots.receiving_id to po_receivings.id ──
-    result = conn.execute(sa.text(
-        "SELECT EXISTS (SELECT FROM information_schema.table_constraints "
-        "WHERE constraint_name = 'fk_po_snapshots_receiving_id')"
-    ))
-    if not result.scalar():
-        op.create_foreign_key(
-            'fk_po_snapshots_receiving_id',
+    # FKs are added NOT VALID (no scan under the ADD CONSTRAINT lock) and
+    # validated below once that lock has been released by a commit
+    if not state.has_fk1:
+        _ensure_constraint(
+            conn,
             'po_snapshots',
-            'po_receivings',
-            ['receiving_id'],
-            ['id']
+            'fk_po_snapshots_receiving_id',
+            'FOREIGN KEY (receiving_id) REFERENCES po_receivings (id) NOT VALID'
         )
-        print("[006] Created fk_po_snapshots_receiving_id")
+        log.info("[006] Created fk_po_snapshots_receiving_id")
     else:
-        print("[006] fk_po_snapshots_receiving_id already exists")
+        log.info("[006] fk_po_snapshots_receiving_id already exists")
 
     # ── FK from po_receiving_line_items.po_line_item_id to po_line_items.id ──
-    result = conn.execute(sa.text(
-        "SELECT EXISTS (SELECT FROM information_schema.table_constraints "
-        "WHERE constraint_name = 'fk_po_receiving_line_items_po_line_item_id')"
-    ))
-    if not result.scalar():
-        op.create_foreign_key(
-            'fk_po_receiving_line_items_po_line_item_id',
+    if not state.has_fk2:
+        _ensure_constraint(
+            conn,
             'po_receiving_line_items',
-            'po_line_items',
-            ['po_line_item_id'],
-            ['id']
+            'fk_po_receiving_line_items_po_line_item_id',
+            'FOREIGN KEY (po_line_item_id) REFERENCES po_line_items (id) NOT VALID'
         )
-        print("[006] Created fk_po_receiving_line_items_po_line_item_id")
+        log.info("[006] Created fk_po_receiving_line_items_po_line_item_id")
     else:
-        print("[006] fk_po_receiving_line_items_po_line_item_id already exists")
-
-    print("[006] SUCCESS — all PO columns, constraints, and enums verified")
+        log.info("[006] fk_po_receiving_line_items_po_line_item_id already exists")
+
+    # autocommit_block commits everything above first, so VALIDATE runs in its
+    # own transaction under SHARE UPDATE EXCLUSIVE and writers are not blocked
+    if not (state.has_fk1 and state.has_fk2):
+        with op.get_context().autocommit_block():
+            if not state.has_fk1:
+                op.execute("ALTER TABLE po_snapshots VALIDATE CONSTRAINT fk_po_snapshots_receiving_id")
+            if not state.has_fk2:
+                op.execute(
+                    "ALTER TABLE po_receiving_line_items "
+                    "VALIDATE CONSTRAINT fk_po_receiving_line_items_po_line_item_id"
+                )
+        log.info("[006] Validated PO foreign keys")
+
+    log.info("[006] SUCCESS — all PO columns, constraints, and enums verified")
 
 
 def downgrade():
@@ -32,38 +32,64 @@ def _column_exists(table, column):
     return result.fetchone() is not None
 
 
+def _existing_columns(tables):
+    """Return the (table, column) pairs present on `tables` in one catalog query."""
+    conn = op.get_bind()
+    result = conn.execute(
+        sa.text(
+            "SELECT table_name, column_name FROM information_schema.columns "
+            "WHERE table_name IN :tables"
+        ).bindparams(sa.bindparam('tables', expanding=True)),
+        {"tables": list(tables)}
+    )
+    return {(table, column) for table, column in result}
+
+
+def _add_missing_columns(table, columns, existing):
+    """Add whichever of (name, type) `columns` are missing in one ALTER TABLE.
+
+    Returns the names that were added.
+    """
+    missing = [(name, type_) for name, type_ in columns if (table, name) not in existing]
+    if missing:
+        op.execute(
+            f"ALTER TABLE {table} "
+            + ", ".join(f"ADD COLUMN {name} {type_}" for name, type_ in missing)
+        )
+    return [name for name, _ in missing]
+
+
 def upgrade():
+    existing = _existing_columns(
+        ['parts', 'profiles', 'quote_line_items', 'quotes', 'quote_line_item_snapshots']
+    )
+
     # 1. Part model: add vendor linkage + pricebook fields
-    if not _column_exists('parts', 'vendor_id'):
-        op.add_column('parts', sa.Column('vendor_id', sa.Integer(), nullable=True))
+    added = _add_missing_columns('parts', [
+        ('vendor_id', 'INTEGER'),
+        ('list_price', 'FLOAT'),
+        ('discount_percent', 'FLOAT'),
+    ], existing)
+    if 'vendor_id' in added:
         op.create_foreign_key('fk_parts_vendor_id', 'parts', 'profiles', ['vendor_id'], ['id'])
 
-    if not _column_exists('parts', 'list_price'):
-        op.add_column('parts', sa.Column('list_price', sa.Float(), nullable=True))
-
-    if not _column_exists('parts', 'discount_percent'):
-        op.add_column('parts', sa.Column('discount_percent', sa.Float(), nullable=True))
-
     # 2. Profile (vendor): add default discount
-    if not _column_exists('profiles', 'default_discount_percent'):
+    if ('profiles', 'default_discount_percent') not in existing:
         op.add_column('profiles', sa.Column('default_discount_percent', sa.Float(), nullable=True))
 
     # 3. QuoteLineItem: add per-line-item markup
-    if not _column_exists('quote_line_items', 'markup_percent'):
+    if ('quote_line_items', 'markup_percent') not in existing:
         op.add_column('quote_line_items', sa.Column('markup_percent', sa.Float(), nullable=True))
 
     # 4. Quote: add section-level markup columns, migrate data, drop old column
-    if not _column_exists('quotes', 'parts_markup_percent'):
-        op.add_column('quotes', sa.Column('parts_markup_percent', sa.Float(), nullable=True))
-
-    if not _column_exists('quotes', 'labor_markup_percent'):
-        op.add_column('quotes', sa.Column('labor_markup_percent', sa.Float(), nullable=True))
-
-    if not _column_exists('quotes', 'misc_markup_percent'):
-        op.add_column('quotes', sa.Column('misc_markup_percent', sa.Float(), nullable=True))
+    _add_missing_columns('quotes', [
+        ('parts_markup_percent', 'FLOAT'),
+        ('labor_markup_percent', 'FLOAT'),
+        ('misc_markup_percent', 'FLOAT'),
+    ], existing)
 
     # Migrate existing data: copy global → all three sections
-    if _column_exists('quotes', 'global_markup_percent'):
+    if ('quotes', 'global_markup_percent') in existing:
         conn = op.get_bind()
         conn.execute(sa.text("""
             UPDATE quotes
@@ -75,7 +101,7 @@ def upgrade():
         op.drop_column('quotes', 'global_markup_percent')
 
     # 5. QuoteLineItemSnapshot: add markup_percent
-    if not _column_exists('quote_line_item_snapshots', 'markup_percent'):
+    if ('quote_line_item_snapshots', 'markup_percent') not in existing:
         op.add_column('quote_line_item_snapshots', sa.Column('markup_percent', sa.Float(), nullable=True))
 
 
@@ -74,28 +74,23 @@ def upgrade() -> None:
     # Check if system_rates already has data (idempotent)
     count = conn.execute(sa.text("SELECT COUNT(*) FROM system_rates")).scalar()
     if count == 0:
-        # Read existing system misc items
-        rows = conn.execute(sa.text(
-            "SELECT id, description, unit_price, markup_percent "
-            "FROM miscellaneous WHERE is_system_item = true"
-        )).fetchall()
-
-        for row in rows:
-            misc_id, description, unit_price, markup_percent = row
-            mapping = SYSTEM_ITEM_MAP.get(description)
-            if mapping:
-                rate_type, sort_order = mapping
-                conn.execute(sa.text(
-                    "INSERT INTO system_rates (rate_type, description, unit_price, markup_percent, sort_order, is_active, linked_misc_id) "
-                    "VALUES (:rate_type, :description, :unit_price, :markup_percent, :sort_order, true, :linked_misc_id)"
-                ), {
-                    "rate_type": rate_type,
-                    "description": description,
-                    "unit_price": unit_price,
-                    "markup_percent": markup_percent,
-                    "sort_order": sort_order,
-                    "linked_misc_id": misc_id,
-                })
+        # Join the system misc items to SYSTEM_ITEM_MAP inside Postgres and
+        # insert every mapped rate with one INSERT ... SELECT
+        values = []
+        params = {}
+        for i, (description, (rate_type, sort_order)) in enumerate(SYSTEM_ITEM_MAP.items()):
+            values.append(f"(:description_{i}, :rate_type_{i}, :sort_order_{i})")
+            params[f"description_{i}"] = description
+            params[f"rate_type_{i}"] = rate_type
+            params[f"sort_order_{i}"] = sort_order
+
+        conn.execute(sa.text(
+            "INSERT INTO system_rates (rate_type, description, unit_price, markup_percent, sort_order, is_active, linked_misc_id) "
+            "SELECT m.rate_type, misc.description, misc.unit_price, misc.markup_percent, m.sort_order, true, misc.id "
+            f"FROM miscellaneous misc JOIN (VALUES {', '.join(values)}) "
+            "AS m (description, rate_type, sort_order) ON m.description = misc.description "
+            "WHERE misc.is_system_item = true"
+        ), params)
 
 
 def downgrade() -> None:
@@ -0,0 +1,42 @@
+"""Index line item and snapshot tables by their parent
+
+Every quote, PO and invoice detail view loads its line items (and every
+revert loads its snapshot rows) by parent id. None of those foreign keys
+were indexed, so each load was a sequential scan of the whole table.
+
+Indexes are built CONCURRENTLY so the build does not block writes.
+
+Revision ID: 017_line_item_indexes
+Revises: 016_add_company_logo
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+
+revision = '017_line_item_indexes'
+down_revision = '016_add_company_logo'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns) — mirrors __table_args__ in models.py
+INDEXES = [
+    ('ix_qli_quote_type', 'quote_line_items', 'quote_id, item_type'),
+    ('ix_poli_po_type', 'po_line_items', 'purchase_order_id, item_type'),
+    ('ix_ili_invoice', 'invoice_line_items', 'invoice_id'),
+    ('ix_quote_snapshots_quote_version', 'quote_snapshots', 'quote_id, version'),
+    ('ix_qlis_snapshot', 'quote_line_item_snapshots', 'snapshot_id'),
+]
+
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,62 @@
+"""Give defaulted integer/boolean columns a server-side DEFAULT
+
+These columns only had Python-side defaults in models.py, and some of
+the tables created after the baseline never got a DEFAULT in the
+database. SET DEFAULT is catalog-only (no rewrite, no scan), so it is
+applied to every column whether or not it already matches.
+
+Revision ID: 018_column_server_defaults
+Revises: 017_line_item_indexes
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+
+revision = '018_column_server_defaults'
+down_revision = '017_line_item_indexes'
+branch_labels = None
+depends_on = None
+
+
+# table -> {column: default} — mirrors server_default in models.py
+SERVER_DEFAULTS = {
+    'miscellaneous': {'is_system_item': 'false'},
+    'quotes': {'current_version': '0', 'markup_control_enabled': 'false'},
+    'quote_line_items': {'quantity': '1', 'qty_pending': '0', 'qty_fulfilled': '0', 'is_pms': 'false'},
+    'purchase_orders': {'current_version': '0'},
+    'po_line_items': {'quantity': '1', 'qty_pending': '0', 'qty_received': '0'},
+    'po_line_item_snapshots': {'is_deleted': 'false'},
+    'system_rates': {'sort_order': '0', 'is_active': 'true'},
+    'quote_line_item_snapshots': {'is_deleted': 'false', 'is_pms': 'false'},
+}
+
+# Defaults the baseline and earlier migrations already created; downgrade
+# leaves these in place and only drops the ones added here.
+PRE_EXISTING = {
+    ('quotes', 'current_version'), ('quotes', 'markup_control_enabled'),
+    ('quote_line_items', 'quantity'), ('quote_line_items', 'qty_pending'),
+    ('quote_line_items', 'qty_fulfilled'), ('quote_line_items', 'is_pms'),
+    ('purchase_orders', 'current_version'),
+    ('po_line_items', 'quantity'), ('po_line_items', 'qty_pending'), ('po_line_items', 'qty_received'),
+    ('system_rates', 'sort_order'), ('system_rates', 'is_active'),
+    ('quote_line_item_snapshots', 'is_deleted'), ('quote_line_item_snapshots', 'is_pms'),
+}
+
+
+def upgrade():
+    # One multi-clause ALTER per table
+    for table, defaults in SERVER_DEFAULTS.items():
+        op.execute(
+            f"ALTER TABLE {table} "
+            + ", ".join(f"ALTER COLUMN {column} SET DEFAULT {value}" for column, value in defaults.items())
+        )
+
+
+def downgrade():
+    for table, defaults in SERVER_DEFAULTS.items():
+        added = [column for column in defaults if (table, column) not in PRE_EXISTING]
+        if added:
+            op.execute(
+                f"ALTER TABLE {table} "
+                + ", ".join(f"ALTER COLUMN {column} DROP DEFAULT" for column in added)
+            )
@@ -0,0 +1,43 @@
+"""Index the catalog lookups that run by labor id and system-item description
+
+- part_labor_link is keyed (part_id, labor_id), so unlinking or checking a
+  labor item by labor_id alone scanned the whole link table.
+- System misc items are looked up by exact description ("Parking (1 Hour)")
+  and by prefix ("Travel Distance%"). The partial index covers only system
+  rows, and text_pattern_ops lets the planner use it for the LIKE prefix
+  whatever the database collation.
+
+Indexes are built CONCURRENTLY so the build does not block writes.
+
+Revision ID: 019_catalog_lookup_indexes
+Revises: 018_column_server_defaults
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+
+revision = '019_catalog_lookup_indexes'
+down_revision = '018_column_server_defaults'
+branch_labels = None
+depends_on = None
+
+
+# (index name, CREATE INDEX body) — mirrors models.py
+INDEXES = [
+    ('ix_part_labor_link_labor', 'part_labor_link (labor_id)'),
+    ('ix_misc_system_description',
+     'miscellaneous (description text_pattern_ops) WHERE is_system_item'),
+]
+
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, body in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {body}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
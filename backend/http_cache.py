@@ -0,0 +1,20 @@
+"""
+HTTP caching helpers for read endpoints.
+Detail routes wrap their serialized body so repeat reads can be answered with 304.
+"""
+import hashlib
+
+from fastapi import Request, Response
+
+
+def etag_response(request: Request, body: bytes) -> Response:
+    """Return a JSON body with a weak ETag, or a bare 304 if the client already has it."""
+    etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    # If-None-Match uses weak comparison and may list several tags
+    client_tags = {
+        tag.strip().removeprefix("W/")
+        for tag in request.headers.get("if-none-match", "").split(",")
+    }
+    if "*" in client_tags or etag.removeprefix("W/") in client_tags:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
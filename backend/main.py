@@ -2,12 +2,13 @@ import os
 from pathlib import Path
 
 # Load environment variables from .env file (for local development)
-from dotenv import load_dotenv
 env_path = Path(__file__).parent / ".env"
 if env_path.exists():
+    from dotenv import load_dotenv
     load_dotenv(env_path)
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from database import engine, Base, SessionLocal
@@ -24,19 +25,33 @@ def run_migrations():
 
     Handles legacy databases that predate the migration system by
     auto-stamping to the latest revision when tables exist but
-    alembic_version does not.
+    alembic_version does not, and returns early when alembic_version is
+    already at head.
     """
-    from sqlalchemy import text, inspect
+    from sqlalchemy import text
     from alembic.config import Config
+    from alembic.script import ScriptDirectory
     from alembic import command
 
     alembic_cfg = Config(os.path.join(os.path.dirname(__file__), "alembic.ini"))
 
-    # Detect legacy database: tables exist but no alembic_version tracking
-    inspector = inspect(engine)
-    tables = inspector.get_table_names()
-    has_app_tables = "quotes" in tables or "profiles" in tables
-    has_alembic = "alembic_version" in tables
+    with engine.connect() as conn:
+        # Detect legacy database: tables exist but no alembic_version tracking.
+        # to_regclass answers from the catalog without reflecting every table.
+        has_app_tables, has_alembic = conn.execute(text(
+            "SELECT to_regclass('quotes') IS NOT NULL OR to_regclass('profiles') IS NOT NULL, "
+            "to_regclass('alembic_version') IS NOT NULL"
+        )).one()
+
+        # alembic_version records what has run; when it is already at head,
+        # skip command.upgrade (env.py, logging setup and a second engine)
+        current = None
+        if has_alembic:
+            current = conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+    if current is not None and current == ScriptDirectory.from_config(alembic_cfg).get_current_head():
+        print("[STARTUP] Alembic migrations already at head")
+        return
 
     if has_app_tables and not has_alembic:
         # Legacy deploy: stamp to latest revision so Alembic knows the
@@ -71,7 +86,8 @@ init_db()
 app = FastAPI(
     title="UC Velocity ERP",
     description="Enterprise Resource Planning System for managing Customers, Vendors, Inventory, and Projects",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,  # orjson instead of stdlib json for every route
 )
 
 # Get CORS origins from environment variable, with sensible defaults for local dev
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum, Table, DateTime, Boolean, UniqueConstraint, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum, Table, DateTime, Boolean, UniqueConstraint, Text, Index, text
+from sqlalchemy.orm import relationship, configure_mappers
 from datetime import datetime
 import enum
 
@@ -11,7 +11,8 @@ part_labor_link = Table(
     'part_labor_link',
     Base.metadata,
     Column('part_id', Integer, ForeignKey('parts.id'), primary_key=True),
-    Column('labor_id', Integer, ForeignKey('labor.id'), primary_key=True)
+    Column('labor_id', Integer, ForeignKey('labor.id'), primary_key=True),
+    Index('ix_part_labor_link_labor', 'labor_id'),
 )
 
 
@@ -123,13 +124,21 @@ class Labor(Base):
 
 class Miscellaneous(Base):
     __tablename__ = "miscellaneous"
+    __table_args__ = (
+        # System-item lookups by exact description and LIKE prefix
+        Index(
+            'ix_misc_system_description', 'description',
+            postgresql_ops={'description': 'text_pattern_ops'},
+            postgresql_where=text('is_system_item'),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     description = Column(String, nullable=False)
     unit_price = Column(Float, nullable=False)
     markup_percent = Column(Float, default=0.0)
     category_id = Column(Integer, ForeignKey('categories.id'))
-    is_system_item = Column(Boolean, default=False)
+    is_system_item = Column(Boolean, default=False, server_default=text('false'))
 
     # Relationships
     category = relationship("Category")
@@ -174,10 +183,10 @@ class Quote(Base):
     quote_sequence = Column(Integer, nullable=False)  # Per-project sequence number (1, 2, 3...)
     created_at = Column(DateTime, default=datetime.utcnow)
     status = Column(String, default="Draft")  # "Draft", "Work Order", "Invoiced", "Closed" — computed by system
-    current_version = Column(Integer, default=0)  # Current snapshot version
+    current_version = Column(Integer, default=0, server_default=text('0'))  # Current snapshot version
     client_po_number = Column(String, nullable=True)  # Client's PO number (required for invoicing)
     work_description = Column(String, nullable=True)  # Optional work description
-    markup_control_enabled = Column(Boolean, default=False)  # Markup Discount Control toggle
+    markup_control_enabled = Column(Boolean, default=False, server_default=text('false'))  # Markup Discount Control toggle
     parts_markup_percent = Column(Float, nullable=True)  # Section-level markup for parts
     labor_markup_percent = Column(Float, nullable=True)  # Section-level markup for labor
     misc_markup_percent = Column(Float, nullable=True)  # Section-level markup for misc
@@ -193,6 +202,9 @@ class Quote(Base):
 
 class QuoteLineItem(Base):
     __tablename__ = "quote_line_items"
+    __table_args__ = (
+        Index('ix_qli_quote_type', 'quote_id', 'item_type'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     quote_id = Column(Integer, ForeignKey('quotes.id'), nullable=False)
@@ -201,11 +213,11 @@ class QuoteLineItem(Base):
     part_id = Column(Integer, ForeignKey('parts.id'), nullable=True)
     misc_id = Column(Integer, ForeignKey('miscellaneous.id'), nullable=True)
     description = Column(String)  # For misc items or override
-    quantity = Column(Integer, default=1)  # Qty Ordered (must be whole number)
+    quantity = Column(Integer, default=1, server_default=text('1'))  # Qty Ordered (must be whole number)
     unit_price = Column(Float)  # Override price if needed
-    qty_pending = Column(Integer, default=0)  # Remaining to fulfill (must be whole number)
-    qty_fulfilled = Column(Integer, default=0)  # Total fulfilled across all invoices (must be whole number)
-    is_pms = Column(Boolean, default=False)  # True for PMS items (Project Management Services)
+    qty_pending = Column(Integer, default=0, server_default=text('0'))  # Remaining to fulfill (must be whole number)
+    qty_fulfilled = Column(Integer, default=0, server_default=text('0'))  # Total fulfilled across all invoices (must be whole number)
+    is_pms = Column(Boolean, default=False, server_default=text('false'))  # True for PMS items (Project Management Services)
     pms_percent = Column(Float, nullable=True)  # Percentage value for PMS % items (null for PMS $ or non-PMS)
     original_markup_percent = Column(Float, nullable=True)  # Individual markup before global override
     base_cost = Column(Float, nullable=True)  # Base cost used for recalculation
@@ -229,7 +241,7 @@ class PurchaseOrder(Base):
     vendor_id = Column(Integer, ForeignKey('profiles.id'), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     po_sequence = Column(Integer, nullable=False)
-    current_version = Column(Integer, default=0)
+    current_version = Column(Integer, default=0, server_default=text('0'))
     work_description = Column(String, nullable=True)
     vendor_po_number = Column(String, nullable=True)
     expected_delivery_date = Column(DateTime, nullable=True)
@@ -247,16 +259,19 @@ class PurchaseOrder(Base):
 
 class POLineItem(Base):
     __tablename__ = "po_line_items"
+    __table_args__ = (
+        Index('ix_poli_po_type', 'purchase_order_id', 'item_type'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     purchase_order_id = Column(Integer, ForeignKey('purchase_orders.id'), nullable=False)
     item_type = Column(String, nullable=False)  # "part" or "misc" (NO labor for POs)
     part_id = Column(Integer, ForeignKey('parts.id'), nullable=True)
     description = Column(String)  # For misc items or override
-    quantity = Column(Integer, default=1)  # Must be whole number
+    quantity = Column(Integer, default=1, server_default=text('1'))  # Must be whole number
     unit_price = Column(Float)
-    qty_pending = Column(Integer, default=0)
-    qty_received = Column(Integer, default=0)
+    qty_pending = Column(Integer, default=0, server_default=text('0'))
+    qty_received = Column(Integer, default=0, server_default=text('0'))
     actual_unit_price = Column(Float, nullable=True)
 
     # Relationships
@@ -332,7 +347,7 @@ class POLineItemSnapshot(Base):
     qty_pending = Column(Integer, nullable=True)
     qty_received = Column(Integer, nullable=True)
     actual_unit_price = Column(Float, nullable=True)
-    is_deleted = Column(Boolean, default=False)
+    is_deleted = Column(Boolean, default=False, server_default=text('false'))
 
     # Relationships
     snapshot = relationship("POSnapshot", back_populates="line_item_states")
@@ -358,6 +373,9 @@ class Invoice(Base):
 
 class InvoiceLineItem(Base):
     __tablename__ = "invoice_line_items"
+    __table_args__ = (
+        Index('ix_ili_invoice', 'invoice_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     invoice_id = Column(Integer, ForeignKey('invoices.id'), nullable=False)
@@ -385,6 +403,9 @@ class InvoiceLineItem(Base):
 
 class QuoteSnapshot(Base):
     __tablename__ = "quote_snapshots"
+    __table_args__ = (
+        Index('ix_quote_snapshots_quote_version', 'quote_id', 'version'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     quote_id = Column(Integer, ForeignKey('quotes.id'), nullable=False)
@@ -407,8 +428,8 @@ class SystemRate(Base):
     description = Column(String, nullable=False)
     unit_price = Column(Float, nullable=False)
     markup_percent = Column(Float, nullable=False, default=0.0)
-    sort_order = Column(Integer, nullable=False, default=0)
-    is_active = Column(Boolean, nullable=False, default=True)
+    sort_order = Column(Integer, nullable=False, default=0, server_default=text('0'))
+    is_active = Column(Boolean, nullable=False, default=True, server_default=text('true'))
     linked_misc_id = Column(Integer, ForeignKey('miscellaneous.id'), nullable=True)
 
     # Relationships
@@ -431,6 +452,9 @@ class CompanySettings(Base):
 
 class QuoteLineItemSnapshot(Base):
     __tablename__ = "quote_line_item_snapshots"
+    __table_args__ = (
+        Index('ix_qlis_snapshot', 'snapshot_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     snapshot_id = Column(Integer, ForeignKey('quote_snapshots.id'), nullable=False)
@@ -446,8 +470,8 @@ class QuoteLineItemSnapshot(Base):
     unit_price = Column(Float)
     qty_pending = Column(Integer)  # Must be whole number
     qty_fulfilled = Column(Integer)  # Must be whole number
-    is_deleted = Column(Boolean, default=False)  # Track if item was deleted at this snapshot
-    is_pms = Column(Boolean, default=False)  # True for PMS items (Project Management Services)
+    is_deleted = Column(Boolean, default=False, server_default=text('false'))  # Track if item was deleted at this snapshot
+    is_pms = Column(Boolean, default=False, server_default=text('false'))  # True for PMS items (Project Management Services)
     pms_percent = Column(Float, nullable=True)  # Percentage value for PMS % items
     original_markup_percent = Column(Float, nullable=True)  # Individual markup before global override
     base_cost = Column(Float, nullable=True)  # Base cost used for recalculation
@@ -455,3 +479,7 @@ class QuoteLineItemSnapshot(Base):
 
     # Relationships
     snapshot = relationship("QuoteSnapshot", back_populates="line_item_states")
+
+
+# Resolve relationships at import time instead of on the first request's query
+configure_mappers()
@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List, Optional
 from datetime import datetime, date
 
 from database import get_db
 from models import (
     Quote, QuoteLineItem, Invoice, InvoiceLineItem,
-    QuoteSnapshot, QuoteLineItemSnapshot, Labor, Part, Miscellaneous,
+    QuoteSnapshot, QuoteLineItemSnapshot,
     Project, Profile, CompanySettings
 )
 from schemas import (
@@ -60,7 +60,9 @@ def list_invoices(
 
         hst_amount = net_sales * (hst_rate / 100)
 
-        results.append(InvoiceSummaryItem(
+        # model_construct: the response_model validates the dumped rows once
+        # on the way out, so validating here as well would do it twice.
+        results.append(InvoiceSummaryItem.model_construct(
             invoice_id=inv.id,
             invoice_date=inv.created_at,
             uca_project_number=inv.quote.project.uca_project_number,
@@ -75,28 +77,12 @@ def list_invoices(
     return results
 
 
-def get_line_item_description_for_invoice(item: QuoteLineItem, db: Session) -> str:
-    """Get a human-readable description for a line item."""
-    if item.item_type == "labor" and item.labor_id:
-        labor = db.query(Labor).filter(Labor.id == item.labor_id).first()
-        return labor.description if labor else "Labor"
-    elif item.item_type == "part" and item.part_id:
-        part = db.query(Part).filter(Part.id == item.part_id).first()
-        return part.part_number if part else "Part"
-    elif item.item_type == "misc":
-        if item.misc_id:
-            misc = db.query(Miscellaneous).filter(Miscellaneous.id == item.misc_id).first()
-            return misc.description if misc else "Misc"
-        return item.description or "Misc"
-    return "Unknown item"
-
-
 @router.get("/{invoice_id}", response_model=InvoiceSchema)
 def get_invoice(invoice_id: int, db: Session = Depends(get_db)):
     """Get a single invoice with all line items."""
     invoice = (
         db.query(Invoice)
-        .options(joinedload(Invoice.line_items))
+        .options(selectinload(Invoice.line_items))
         .filter(Invoice.id == invoice_id)
         .first()
     )
@@ -1,25 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select, update, delete, bindparam
 from sqlalchemy.orm import Session
 from typing import List
 
 from database import get_db
-from models import Labor
+from models import Labor, part_labor_link
 from schemas import LaborCreate, LaborUpdate, Labor as LaborSchema
 
 router = APIRouter(prefix="/labor", tags=["labor"])
 
+# Built once at import; each request only binds the id
+LABOR_BY_ID = select(Labor).where(Labor.id == bindparam("labor_id"))
+
 
 @router.get("/", response_model=List[LaborSchema])
 def get_all_labor(skip: int = 0, limit: int = None, db: Session = Depends(get_db)):  # limit=None until pagination is implemented
     """Get all labor items with pagination."""
-    labor_items = db.query(Labor).offset(skip).limit(limit).all()
+    # Plain column rows: the response model only needs the scalar fields,
+    # so there is no reason to build identity-mapped Labor instances.
+    labor_items = db.execute(
+        select(
+            Labor.id, Labor.description, Labor.hours, Labor.rate,
+            Labor.markup_percent, Labor.category_id,
+        )
+        .offset(skip)
+        .limit(limit)
+    ).mappings().all()
     return labor_items
 
 
 @router.get("/{labor_id}", response_model=LaborSchema)
 def get_labor(labor_id: int, db: Session = Depends(get_db)):
     """Get a single labor item by ID."""
-    labor = db.query(Labor).filter(Labor.id == labor_id).first()
+    labor = db.execute(LABOR_BY_ID, {"labor_id": labor_id}).scalar_one_or_none()
     if not labor:
         raise HTTPException(status_code=404, detail="Labor not found")
     return labor
@@ -28,14 +41,11 @@ def get_labor(labor_id: int, db: Session = Depends(get_db)):
 @router.post("/", response_model=LaborSchema)
 def create_labor(labor_data: LaborCreate, db: Session = Depends(get_db)):
     """Create a new Labor entry."""
-    # Round markup_percent to 2 decimal places
-    formatted_markup = round(labor_data.markup_percent, 2)
-
     db_labor = Labor(
         description=labor_data.description,
         hours=labor_data.hours,
         rate=labor_data.rate,
-        markup_percent=formatted_markup,
+        markup_percent=labor_data.markup_percent,
         category_id=labor_data.category_id
     )
 
@@ -49,34 +59,35 @@ def create_labor(labor_data: LaborCreate, db: Session = Depends(get_db)):
 @router.put("/{labor_id}", response_model=LaborSchema)
 def update_labor(labor_id: int, labor_data: LaborUpdate, db: Session = Depends(get_db)):
     """Update a labor item."""
-    db_labor = db.query(Labor).filter(Labor.id == labor_id).first()
+    # Update fields if provided
+    changes = labor_data.model_dump(exclude_none=True)
+    if not changes:
+        return get_labor(labor_id, db)
+
+    # A single UPDATE ... RETURNING replaces SELECT, UPDATE and refresh
+    db_labor = db.execute(
+        update(Labor)
+        .where(Labor.id == labor_id)
+        .values(**changes)
+        .returning(*Labor.__table__.c)
+    ).mappings().one_or_none()
     if not db_labor:
         raise HTTPException(status_code=404, detail="Labor not found")
 
-    # Update fields if provided
-    if labor_data.description is not None:
-        db_labor.description = labor_data.description
-    if labor_data.hours is not None:
-        db_labor.hours = labor_data.hours
-    if labor_data.rate is not None:
-        db_labor.rate = labor_data.rate
-    if labor_data.markup_percent is not None:
-        db_labor.markup_percent = round(labor_data.markup_percent, 2)
-    if labor_data.category_id is not None:
-        db_labor.category_id = labor_data.category_id
-
     db.commit()
-    db.refresh(db_labor)
     return db_labor
 
 
 @router.delete("/{labor_id}")
 def delete_labor(labor_id: int, db: Session = Depends(get_db)):
     """Delete a labor item."""
-    db_labor = db.query(Labor).filter(Labor.id == labor_id).first()
-    if not db_labor:
+    # Unlink from parts, then delete by id; no row is loaded first
+    db.execute(delete(part_labor_link).where(part_labor_link.c.labor_id == labor_id))
+    deleted_id = db.execute(
+        delete(Labor).where(Labor.id == labor_id).returning(Labor.id)
+    ).scalar_one_or_none()
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="Labor not found")
 
-    db.delete(db_labor)
     db.commit()
     return {"message": "Labor deleted successfully"}
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, select, update, delete, exists, bindparam
 from typing import List
 
 from database import get_db
@@ -11,11 +11,24 @@ from schemas import (
 
 router = APIRouter(prefix="/misc", tags=["miscellaneous"])
 
+# Built once at import; each request only binds the id
+MISC_BY_ID = select(Miscellaneous).where(Miscellaneous.id == bindparam("misc_id"))
+
 
 @router.get("/", response_model=List[MiscellaneousSchema])
 def get_all_miscellaneous(skip: int = 0, limit: int = None, db: Session = Depends(get_db)):  # limit=None until pagination is implemented
     """Get all miscellaneous items with pagination."""
-    misc_items = db.query(Miscellaneous).offset(skip).limit(limit).all()
+    # Plain column rows: the response model only needs the scalar fields,
+    # so there is no reason to build identity-mapped Miscellaneous instances.
+    misc_items = db.execute(
+        select(
+            Miscellaneous.id, Miscellaneous.description, Miscellaneous.unit_price,
+            Miscellaneous.markup_percent, Miscellaneous.category_id,
+            Miscellaneous.is_system_item,
+        )
+        .offset(skip)
+        .limit(limit)
+    ).mappings().all()
     return misc_items
 
 
@@ -52,7 +65,7 @@ def get_travel_distance_items(db: Session = Depends(get_db)):
 @router.get("/{misc_id}", response_model=MiscellaneousSchema)
 def get_miscellaneous(misc_id: int, db: Session = Depends(get_db)):
     """Get a single miscellaneous item by ID."""
-    misc = db.query(Miscellaneous).filter(Miscellaneous.id == misc_id).first()
+    misc = db.execute(MISC_BY_ID, {"misc_id": misc_id}).scalar_one_or_none()
     if not misc:
         raise HTTPException(status_code=404, detail="Miscellaneous item not found")
     return misc
@@ -61,13 +74,10 @@ def get_miscellaneous(misc_id: int, db: Session = Depends(get_db)):
 @router.post("/", response_model=MiscellaneousSchema)
 def create_miscellaneous(misc_data: MiscellaneousCreate, db: Session = Depends(get_db)):
     """Create a new miscellaneous item."""
-    # Round markup_percent to 2 decimal places
-    formatted_markup = round(misc_data.markup_percent, 2)
-
     db_misc = Miscellaneous(
         description=misc_data.description,
         unit_price=misc_data.unit_price,
-        markup_percent=formatted_markup,
+        markup_percent=misc_data.markup_percent,
         category_id=misc_data.category_id,
         is_system_item=False  # User-created items are not system items
     )
@@ -84,38 +94,41 @@ def update_miscellaneous(
     db: Session = Depends(get_db)
 ):
     """Update a miscellaneous item."""
-    db_misc = db.query(Miscellaneous).filter(Miscellaneous.id == misc_id).first()
+    changes = misc_data.model_dump(exclude_none=True)
+    if not changes:
+        return get_miscellaneous(misc_id, db)
+
+    # A single UPDATE ... RETURNING replaces SELECT, UPDATE and refresh
+    db_misc = db.execute(
+        update(Miscellaneous)
+        .where(Miscellaneous.id == misc_id)
+        .values(**changes)
+        .returning(*Miscellaneous.__table__.c)
+    ).mappings().one_or_none()
     if not db_misc:
         raise HTTPException(status_code=404, detail="Miscellaneous item not found")
 
-    if misc_data.description is not None:
-        db_misc.description = misc_data.description
-    if misc_data.unit_price is not None:
-        db_misc.unit_price = misc_data.unit_price
-    if misc_data.markup_percent is not None:
-        db_misc.markup_percent = round(misc_data.markup_percent, 2)
-    if misc_data.category_id is not None:
-        db_misc.category_id = misc_data.category_id
-
     db.commit()
-    db.refresh(db_misc)
     return db_misc
 
 
 @router.delete("/{misc_id}")
 def delete_miscellaneous(misc_id: int, db: Session = Depends(get_db)):
     """Delete a miscellaneous item."""
-    db_misc = db.query(Miscellaneous).filter(Miscellaneous.id == misc_id).first()
-    if not db_misc:
-        raise HTTPException(status_code=404, detail="Miscellaneous item not found")
-
-    # Prevent deletion of system items
-    if db_misc.is_system_item:
+    # System items are excluded by the DELETE itself
+    deleted_id = db.execute(
+        delete(Miscellaneous)
+        .where(Miscellaneous.id == misc_id, Miscellaneous.is_system_item.isnot(True))
+        .returning(Miscellaneous.id)
+    ).scalar_one_or_none()
+    if deleted_id is None:
+        # Nothing deleted: tell a missing row apart from a protected system item
+        if not db.scalar(select(exists().where(Miscellaneous.id == misc_id))):
+            raise HTTPException(status_code=404, detail="Miscellaneous item not found")
         raise HTTPException(
             status_code=403,
             detail="System items cannot be deleted"
         )
 
-    db.delete(db_misc)
     db.commit()
     return {"message": "Miscellaneous item deleted successfully"}
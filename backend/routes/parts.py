@@ -1,13 +1,61 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, insert, delete, bindparam, exists
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List
 
 from database import get_db
-from models import Part, Labor, Profile
+from models import Part, Labor, Profile, part_labor_link
 from schemas import PartCreate, PartUpdate, Part as PartSchema, PartWithLabor
 
 router = APIRouter(prefix="/parts", tags=["parts"])
 
+# Postgres' default name for the UNIQUE on parts.part_number
+PART_NUMBER_UNIQUE = "parts_part_number_key"
+
+# Built once at import; each request only binds the id
+PART_WITH_LABOR_BY_ID = (
+    select(Part)
+    .options(selectinload(Part.labor_items), joinedload(Part.vendor))
+    .where(Part.id == bindparam("part_id"))
+)
+
+
+def verify_labor_ids(labor_ids: List[int], db: Session) -> List[int]:
+    """Return the distinct requested labor IDs, or 400 if any don't exist."""
+    found_ids = set(db.execute(select(Labor.id).where(Labor.id.in_(labor_ids))).scalars())
+    missing_ids = set(labor_ids) - found_ids
+    if missing_ids:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Labor items not found: {list(missing_ids)}"
+        )
+    return sorted(found_ids)
+
+
+def commit_part(db: Session, part: Part, labor_ids: List[int]) -> None:
+    """Flush the part, insert its labor links, and commit.
+
+    Links go straight into part_labor_link by ID, so linking never loads
+    Labor rows. A duplicate part_number is reported by the unique
+    constraint and turned into a 400, so the happy path skips a SELECT and
+    two concurrent writers can't both pass a pre-check.
+    """
+    try:
+        db.flush()
+        if labor_ids:
+            db.execute(
+                insert(part_labor_link),
+                [{"part_id": part.id, "labor_id": labor_id} for labor_id in labor_ids],
+            )
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        diag = getattr(e.orig, "diag", None)
+        if getattr(diag, "constraint_name", None) == PART_NUMBER_UNIQUE:
+            raise HTTPException(status_code=400, detail="Part number already exists")
+        raise
+
 
 def auto_calculate_cost(part: Part, db: Session) -> None:
     """Auto-calculate cost from list_price and vendor discount when applicable."""
@@ -27,7 +75,7 @@ def get_all_parts(skip: int = 0, limit: int = None, db: Session = Depends(get_db
     """Get all parts with their linked labor items."""
     parts = (
         db.query(Part)
-        .options(joinedload(Part.labor_items), joinedload(Part.vendor))
+        .options(selectinload(Part.labor_items), joinedload(Part.vendor))
         .offset(skip)
         .limit(limit)
         .all()
@@ -38,12 +86,7 @@ def get_all_parts(skip: int = 0, limit: int = None, db: Session = Depends(get_db
 @router.get("/{part_id}", response_model=PartWithLabor)
 def get_part(part_id: int, db: Session = Depends(get_db)):
     """Get a single part by ID with linked labor items."""
-    part = (
-        db.query(Part)
-        .options(joinedload(Part.labor_items), joinedload(Part.vendor))
-        .filter(Part.id == part_id)
-        .first()
-    )
+    part = db.execute(PART_WITH_LABOR_BY_ID, {"part_id": part_id}).scalar_one_or_none()
     if not part:
         raise HTTPException(status_code=404, detail="Part not found")
     return part
@@ -52,41 +95,21 @@ def get_part(part_id: int, db: Session = Depends(get_db)):
 @router.post("/", response_model=PartWithLabor)
 def create_part(part_data: PartCreate, db: Session = Depends(get_db)):
     """Create a new part with optional labor linking."""
-    # Check for duplicate part number
-    existing = db.query(Part).filter(Part.part_number == part_data.part_number).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Part number already exists")
-
     # Validate all labor IDs exist BEFORE creating part
-    labor_to_link = []
+    labor_ids = []
     if part_data.linked_labor_ids:
-        labor_to_link = db.query(Labor).filter(
-            Labor.id.in_(part_data.linked_labor_ids)
-        ).all()
-
-        # Verify all requested labor items were found
-        found_ids = {l.id for l in labor_to_link}
-        missing_ids = set(part_data.linked_labor_ids) - found_ids
-        if missing_ids:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Labor items not found: {list(missing_ids)}"
-            )
-
-    # Round markup_percent to 2 decimal places
-    formatted_markup = round(part_data.markup_percent, 2) if part_data.markup_percent else 0.0
+        labor_ids = verify_labor_ids(part_data.linked_labor_ids, db)
 
     # Validate vendor if provided
     if part_data.vendor_id:
-        vendor = db.query(Profile).filter(Profile.id == part_data.vendor_id).first()
-        if not vendor:
+        if not db.scalar(select(exists().where(Profile.id == part_data.vendor_id))):
             raise HTTPException(status_code=400, detail="Vendor not found")
 
     db_part = Part(
         part_number=part_data.part_number,
         description=part_data.description,
         cost=part_data.cost,
-        markup_percent=formatted_markup,
+        markup_percent=part_data.markup_percent,
         category_id=part_data.category_id,
         vendor_id=part_data.vendor_id,
         list_price=part_data.list_price,
@@ -96,11 +119,8 @@ def create_part(part_data: PartCreate, db: Session = Depends(get_db)):
     # Auto-calculate cost from list_price + vendor discount
     auto_calculate_cost(db_part, db)
 
-    # Link the labor items
-    db_part.labor_items = labor_to_link
-
     db.add(db_part)
-    db.commit()
+    commit_part(db, db_part, labor_ids)
     db.refresh(db_part)
     return db_part
 
@@ -114,13 +134,7 @@ def update_part(part_id: int, part_data: PartUpdate, db: Session = Depends(get_d
 
     # Update fields if provided
     if part_data.part_number is not None:
-        # Check for duplicate part number
-        existing = db.query(Part).filter(
-            Part.part_number == part_data.part_number,
-            Part.id != part_id
-        ).first()
-        if existing:
-            raise HTTPException(status_code=400, detail="Part number already exists")
+        # Duplicates are rejected by the unique constraint at commit
         db_part.part_number = part_data.part_number
 
     if part_data.description is not None:
@@ -128,12 +142,11 @@ def update_part(part_id: int, part_data: PartUpdate, db: Session = Depends(get_d
     if part_data.cost is not None:
         db_part.cost = part_data.cost
     if part_data.markup_percent is not None:
-        db_part.markup_percent = round(part_data.markup_percent, 2)
+        db_part.markup_percent = part_data.markup_percent
     if part_data.category_id is not None:
         db_part.category_id = part_data.category_id
     if part_data.vendor_id is not None:
-        vendor = db.query(Profile).filter(Profile.id == part_data.vendor_id).first()
-        if not vendor:
+        if not db.scalar(select(exists().where(Profile.id == part_data.vendor_id))):
             raise HTTPException(status_code=400, detail="Vendor not found")
         db_part.vendor_id = part_data.vendor_id
     if part_data.list_price is not None:
@@ -144,26 +157,14 @@ def update_part(part_id: int, part_data: PartUpdate, db: Session = Depends(get_d
     # Auto-calculate cost from list_price + vendor discount
     auto_calculate_cost(db_part, db)
 
-    # Update labor links if provided
+    # Replace labor links if provided
+    labor_ids = []
     if part_data.linked_labor_ids is not None:
         if part_data.linked_labor_ids:
-            labor_to_link = db.query(Labor).filter(
-                Labor.id.in_(part_data.linked_labor_ids)
-            ).all()
-
-            # Verify all requested labor items were found
-            found_ids = {l.id for l in labor_to_link}
-            missing_ids = set(part_data.linked_labor_ids) - found_ids
-            if missing_ids:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Labor items not found: {list(missing_ids)}"
-                )
-            db_part.labor_items = labor_to_link
-        else:
-            db_part.labor_items = []
+            labor_ids = verify_labor_ids(part_data.linked_labor_ids, db)
+        db.execute(delete(part_labor_link).where(part_labor_link.c.part_id == part_id))
 
-    db.commit()
+    commit_part(db, db_part, labor_ids)
     db.refresh(db_part)
     return db_part
 
@@ -171,10 +172,13 @@ def update_part(part_id: int, part_data: PartUpdate, db: Session = Depends(get_d
 @router.delete("/{part_id}")
 def delete_part(part_id: int, db: Session = Depends(get_db)):
     """Delete a part."""
-    db_part = db.query(Part).filter(Part.id == part_id).first()
-    if not db_part:
+    # Unlink its labor, then delete by id; no row is loaded first
+    db.execute(delete(part_labor_link).where(part_labor_link.c.part_id == part_id))
+    deleted_id = db.execute(
+        delete(Part).where(Part.id == part_id).returning(Part.id)
+    ).scalar_one_or_none()
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="Part not found")
 
-    db.delete(db_part)
     db.commit()
     return {"message": "Part deleted successfully"}
@@ -1,43 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select, delete, exists, bindparam
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List, Optional
 
 from database import get_db
-from models import Profile, ProfileType as ModelProfileType, Contact, ContactPhone, PhoneType as ModelPhoneType
+from http_cache import etag_response
+from models import (
+    Profile, ProfileType as ModelProfileType, Contact, ContactPhone, PhoneType as ModelPhoneType,
+    Project, PurchaseOrder
+)
 from schemas import (
-    ProfileCreate, ProfileUpdate, Profile as ProfileSchema,
+    ProfileCreate, ProfileUpdate, Profile as ProfileSchema, ProfileType,
     ContactCreate, ContactUpdate, Contact as ContactSchema
 )
 
 router = APIRouter(prefix="/profiles", tags=["profiles"])
 
+# Built once at import; each request only binds the id
+PROFILE_WITH_CONTACTS_BY_ID = (
+    select(Profile)
+    .options(selectinload(Profile.contacts).selectinload(Contact.phone_numbers))
+    .where(Profile.id == bindparam("profile_id"))
+)
+
 
 @router.get("/", response_model=List[ProfileSchema])
 def get_all_profiles(
     skip: int = 0,
     limit: int = None,  # No default limit until pagination is implemented
-    profile_type: Optional[str] = Query(None, description="Filter by profile type (customer or vendor)"),
+    profile_type: Optional[ProfileType] = Query(None, description="Filter by profile type (customer or vendor)"),
     db: Session = Depends(get_db)
 ):
     """Get all profiles with optional filtering by type."""
     query = db.query(Profile).options(
-        joinedload(Profile.contacts).joinedload(Contact.phone_numbers)
+        selectinload(Profile.contacts).selectinload(Contact.phone_numbers)
     )
     if profile_type:
-        query = query.filter(Profile.type == ModelProfileType(profile_type))
+        query = query.filter(Profile.type == ModelProfileType(profile_type.value))
     profiles = query.offset(skip).limit(limit).all()
     return profiles
 
 
 @router.get("/{profile_id}", response_model=ProfileSchema)
-def get_profile(profile_id: int, db: Session = Depends(get_db)):
+def get_profile(profile_id: int, request: Request, db: Session = Depends(get_db)):
     """Get a single profile by ID with nested contacts."""
-    profile = db.query(Profile).options(
-        joinedload(Profile.contacts).joinedload(Contact.phone_numbers)
-    ).filter(Profile.id == profile_id).first()
+    profile = db.execute(
+        PROFILE_WITH_CONTACTS_BY_ID, {"profile_id": profile_id}
+    ).scalar_one_or_none()
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
-    return profile
+    return etag_response(request, ProfileSchema.model_validate(profile).model_dump_json().encode())
 
 
 @router.post("/", response_model=ProfileSchema)
@@ -53,39 +65,42 @@ def create_profile(profile_data: ProfileCreate, db: Session = Depends(get_db)):
         website=profile_data.website,
         default_discount_percent=getattr(profile_data, 'default_discount_percent', None)
     )
-    db.add(db_profile)
-    db.flush()  # Get the profile ID
 
-    # Create contacts with phone numbers
-    for contact_data in profile_data.contacts:
-        db_contact = Contact(
-            profile_id=db_profile.id,
+    # Create contacts with phone numbers through the relationships, so the
+    # single flush at commit batches each table's rows into one INSERT
+    db_profile.contacts = [
+        Contact(
             name=contact_data.name,
             job_title=contact_data.job_title,
-            email=contact_data.email
+            email=contact_data.email,
+            phone_numbers=[
+                ContactPhone(
+                    type=ModelPhoneType(phone_data.type.value),
+                    number=phone_data.number
+                )
+                for phone_data in contact_data.phone_numbers
+            ]
         )
-        db.add(db_contact)
-        db.flush()  # Get the contact ID
-
-        for phone_data in contact_data.phone_numbers:
-            db_phone = ContactPhone(
-                contact_id=db_contact.id,
-                type=ModelPhoneType(phone_data.type.value),
-                number=phone_data.number
-            )
-            db.add(db_phone)
-
+        for contact_data in profile_data.contacts
+    ]
+    db.add(db_profile)
+    db.flush()  # Get the profile ID while the instance is still loaded
+    profile_id = db_profile.id
     db.commit()
-    db.refresh(db_profile)
-    return db_profile
+
+    # Reload profile, contacts and phones in three queries rather than
+    # lazy-loading each contact's phone numbers while serializing
+    return db.execute(
+        PROFILE_WITH_CONTACTS_BY_ID, {"profile_id": profile_id}
+    ).scalar_one()
 
 
 @router.put("/{profile_id}", response_model=ProfileSchema)
 def update_profile(profile_id: int, profile_data: ProfileUpdate, db: Session = Depends(get_db)):
     """Update an existing profile (profile fields only, contacts managed separately)."""
-    db_profile = db.query(Profile).options(
-        joinedload(Profile.contacts).joinedload(Contact.phone_numbers)
-    ).filter(Profile.id == profile_id).first()
+    db_profile = db.execute(
+        PROFILE_WITH_CONTACTS_BY_ID, {"profile_id": profile_id}
+    ).scalar_one_or_none()
     if not db_profile:
         raise HTTPException(status_code=404, detail="Profile not found")
 
@@ -112,23 +127,31 @@ def update_profile(profile_id: int, profile_data: ProfileUpdate, db: Session = D
 @router.delete("/{profile_id}")
 def delete_profile(profile_id: int, db: Session = Depends(get_db)):
     """Delete a profile (cascades to contacts)."""
-    db_profile = db.query(Profile).filter(Profile.id == profile_id).first()
-    if not db_profile:
-        raise HTTPException(status_code=404, detail="Profile not found")
-
-    # Check if profile is referenced by projects or POs
-    if db_profile.projects:
+    # Check if profile is referenced by projects or POs (one round trip, no rows loaded)
+    has_projects, has_purchase_orders = db.execute(
+        select(
+            exists().where(Project.customer_id == profile_id),
+            exists().where(PurchaseOrder.vendor_id == profile_id),
+        )
+    ).one()
+    if has_projects:
         raise HTTPException(
             status_code=400,
             detail="Cannot delete profile: referenced by existing projects"
         )
-    if db_profile.purchase_orders:
+    if has_purchase_orders:
         raise HTTPException(
             status_code=400,
             detail="Cannot delete profile: referenced by existing purchase orders"
         )
 
-    db.delete(db_profile)
+    # Contacts and their phones go with it through the ON DELETE CASCADE foreign keys
+    deleted_id = db.execute(
+        delete(Profile).where(Profile.id == profile_id).returning(Profile.id)
+    ).scalar_one_or_none()
+    if deleted_id is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
     db.commit()
     return {"message": "Profile deleted successfully"}
 
@@ -146,19 +169,16 @@ def add_contact(profile_id: int, contact_data: ContactCreate, db: Session = Depe
         profile_id=profile_id,
         name=contact_data.name,
         job_title=contact_data.job_title,
-        email=contact_data.email
+        email=contact_data.email,
+        phone_numbers=[
+            ContactPhone(
+                type=ModelPhoneType(phone_data.type.value),
+                number=phone_data.number
+            )
+            for phone_data in contact_data.phone_numbers
+        ]
     )
     db.add(db_contact)
-    db.flush()
-
-    for phone_data in contact_data.phone_numbers:
-        db_phone = ContactPhone(
-            contact_id=db_contact.id,
-            type=ModelPhoneType(phone_data.type.value),
-            number=phone_data.number
-        )
-        db.add(db_phone)
-
     db.commit()
     db.refresh(db_contact)
     return db_contact
@@ -192,19 +212,22 @@ def update_contact(
     if contact_data.email is not None:
         db_contact.email = contact_data.email
 
-    # If phone_numbers provided, replace all existing
+    # If phone_numbers provided, replace all existing: unchanged phones are
+    # kept as-is, only new ones are inserted, and delete-orphan removes the rest
     if contact_data.phone_numbers is not None:
-        # Delete existing phone numbers
-        db.query(ContactPhone).filter(ContactPhone.contact_id == contact_id).delete()
+        existing = {}
+        for phone in db_contact.phone_numbers:
+            existing.setdefault((phone.type, phone.number), []).append(phone)
 
-        # Add new phone numbers
+        phones = []
         for phone_data in contact_data.phone_numbers:
-            db_phone = ContactPhone(
-                contact_id=contact_id,
-                type=ModelPhoneType(phone_data.type.value),
-                number=phone_data.number
-            )
-            db.add(db_phone)
+            phone_type = ModelPhoneType(phone_data.type.value)
+            matches = existing.get((phone_type, phone_data.number))
+            if matches:
+                phones.append(matches.pop())
+            else:
+                phones.append(ContactPhone(type=phone_type, number=phone_data.number))
+        db_contact.phone_numbers = phones
 
     db.commit()
     db.refresh(db_contact)
@@ -225,9 +248,14 @@ def delete_contact(profile_id: int, contact_id: int, db: Session = Depends(get_d
     if not contact:
         raise HTTPException(status_code=404, detail="Contact not found")
 
-    # Validate at least one contact remains
-    contact_count = db.query(Contact).filter(Contact.profile_id == profile_id).count()
-    if contact_count <= 1:
+    # Validate at least one contact remains (EXISTS stops at the first other contact)
+    has_other_contact = db.query(
+        db.query(Contact).filter(
+            Contact.profile_id == profile_id,
+            Contact.id != contact_id
+        ).exists()
+    ).scalar()
+    if not has_other_contact:
         raise HTTPException(
             status_code=400,
             detail="Cannot delete the last contact. Profile must have at least one contact."
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select, insert, func, bindparam
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List
-import re
 
 from database import get_db
+from http_cache import etag_response
 from models import Project, Profile, ProfileType, PurchaseOrder, Quote
 from schemas import ProjectCreate, ProjectUpdate, Project as ProjectSchema, ProjectFull, Quote as QuoteSchema
 from routes.purchase_orders import format_po_number
@@ -13,8 +14,30 @@ def format_quote_number(uca_project_number: str, quote_sequence: int, current_ve
     """Format the full quote number: {UCA}-{Sequence:04d}-{Version}"""
     return f"{uca_project_number}-{quote_sequence:04d}-{current_version}"
 
+
 router = APIRouter(prefix="/projects", tags=["projects"])
 
+# Auto-generated UCA numbers: letter prefix + 4 digits (legacy imports may be plain integers)
+UCA_PATTERN = r'^[A-Z]+[0-9]{4}$'
+
+# Transaction-level advisory lock key serializing UCA number generation
+UCA_LOCK_KEY = 7_301_001
+
+# Built once at import; each request only binds the id
+PROJECT_FULL_BY_ID = (
+    select(Project)
+    .options(
+        joinedload(Project.customer),
+        # Collections load by IN() so sibling collections don't multiply rows
+        selectinload(Project.quotes).selectinload(Quote.line_items),
+        selectinload(Project.purchase_orders).options(
+            joinedload(PurchaseOrder.vendor),
+            selectinload(PurchaseOrder.line_items)
+        )
+    )
+    .where(Project.id == bindparam("project_id"))
+)
+
 
 def increment_letter_prefix(prefix: str) -> str:
     """
@@ -44,31 +67,29 @@ def generate_next_uca_number(db: Session) -> str:
     Format: Letter(s) + 4-digit number (e.g., A0001, B0001, AA0001)
     - Starts at A0001
     - A0001 → A9999 → B0001 → ... → Z9999 → AA0001 → AB0001 → ...
+
+    Takes a transaction-scoped advisory lock first, so concurrent project
+    creations wait for each other's commit instead of picking the same number.
     """
-    existing = db.query(Project.uca_project_number).all()
-    existing_numbers = [row[0] for row in existing if row[0]]
-
-    def parse_uca(uca: str) -> tuple:
-        """Parse UCA into (letter_prefix, number)"""
-        match = re.match(r'^([A-Z]+)(\d{4})$', uca)
-        if match:
-            return (match.group(1), int(match.group(2)))
-        return ("", 0)
-
-    def uca_sort_key(uca: str) -> tuple:
-        """Sort key: (prefix_length, prefix, number)"""
-        prefix, num = parse_uca(uca)
-        return (len(prefix), prefix, num)
-
-    # Filter to only valid-format numbers for auto-generation
-    # (legacy imports may have plain integers like "1", "27", "3679")
-    valid_numbers = [n for n in existing_numbers if re.match(r'^[A-Z]+\d{4}$', n)]
-    if not valid_numbers:
+    db.execute(select(func.pg_advisory_xact_lock(UCA_LOCK_KEY)))
+
+    # Highest valid-format number: the prefix is all letters and the suffix is
+    # a fixed 4 digits, so (length, bytewise string) order matches
+    # (prefix length, prefix, number)
+    highest = db.execute(
+        select(Project.uca_project_number)
+        .where(Project.uca_project_number.regexp_match(UCA_PATTERN))
+        .order_by(
+            func.length(Project.uca_project_number).desc(),
+            Project.uca_project_number.collate("C").desc(),
+        )
+        .limit(1)
+    ).scalar()
+    if highest is None:
         return "A0001"
 
-    # Find the highest existing UCA number
-    highest = max(valid_numbers, key=uca_sort_key)
-    prefix, number = parse_uca(highest)
+    # The SQL pattern already guarantees the shape, so split by position
+    prefix, number = highest[:-4], int(highest[-4:])
 
     # Increment
     if number < 9999:
@@ -92,21 +113,9 @@ def get_all_projects(skip: int = 0, limit: int = None, db: Session = Depends(get
 
 
 @router.get("/{project_id}", response_model=ProjectFull)
-def get_project(project_id: int, db: Session = Depends(get_db)):
+def get_project(project_id: int, request: Request, db: Session = Depends(get_db)):
     """Get a single project with full nested structure (quotes, POs, line items)."""
-    project = (
-        db.query(Project)
-        .options(
-            joinedload(Project.customer),
-            joinedload(Project.quotes).joinedload(Quote.line_items),
-            joinedload(Project.purchase_orders).options(
-                joinedload(PurchaseOrder.vendor),
-                joinedload(PurchaseOrder.line_items)
-            )
-        )
-        .filter(Project.id == project_id)
-        .first()
-    )
+    project = db.execute(PROJECT_FULL_BY_ID, {"project_id": project_id}).scalar_one_or_none()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
@@ -124,39 +133,45 @@ def get_project(project_id: int, db: Session = Depends(get_db)):
             po.po_sequence,
             po.current_version
         )
-    return response
+    # Already validated above: serialize it here so FastAPI doesn't dump and
+    # re-validate it against response_model (which now only documents the shape)
+    return etag_response(request, response.model_dump_json().encode())
 
 
 @router.post("/", response_model=ProjectSchema)
 def create_project(project_data: ProjectCreate, db: Session = Depends(get_db)):
     """Create a new project with auto-generated UCA number."""
-    # Verify customer exists and is of type CUSTOMER
-    customer = db.query(Profile).filter(Profile.id == project_data.customer_id).first()
-    if not customer:
+    # Validate the customer before taking the UCA lock, so bad requests don't
+    # queue behind it or compute a number they would throw away
+    customer_type = db.scalar(select(Profile.type).where(Profile.id == project_data.customer_id))
+    if customer_type is None:
         raise HTTPException(status_code=400, detail="Customer not found")
-    if customer.type != ProfileType.customer:
+    if customer_type != ProfileType.customer:
         raise HTTPException(status_code=400, detail="Profile must be of type 'customer'")
 
     # Generate next UCA number
     uca_number = generate_next_uca_number(db)
 
-    db_project = Project(
-        name=project_data.name,
-        customer_id=project_data.customer_id,
-        status=project_data.status,
-        ucsh_project_number=project_data.ucsh_project_number,
-        uca_project_number=uca_number,
-        project_lead=project_data.project_lead,
-    )
-    db.add(db_project)
+    project_id = db.execute(
+        insert(Project)
+        .values(
+            customer_id=project_data.customer_id,
+            name=project_data.name,
+            status=project_data.status,
+            ucsh_project_number=project_data.ucsh_project_number,
+            uca_project_number=uca_number,
+            project_lead=project_data.project_lead,
+        )
+        .returning(Project.id)
+    ).scalar_one()
+
     db.commit()
-    db.refresh(db_project)
 
-    # Reload with customer relationship
+    # Load with customer relationship
     db_project = (
         db.query(Project)
         .options(joinedload(Project.customer))
-        .filter(Project.id == db_project.id)
+        .filter(Project.id == project_id)
         .first()
     )
     return db_project
@@ -187,13 +202,13 @@ def update_project(project_id: int, project_data: ProjectUpdate, db: Session = D
         db_project.customer_id = project_data.customer_id
 
     db.commit()
-    db.refresh(db_project)
 
-    # Reload with customer relationship
+    # Reload with customer relationship; this one SELECT repopulates the
+    # instance commit expired, so no separate refresh() is needed
     db_project = (
         db.query(Project)
         .options(joinedload(Project.customer))
-        .filter(Project.id == db_project.id)
+        .filter(Project.id == project_id)
         .first()
     )
     return db_project
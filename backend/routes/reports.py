@@ -73,7 +73,9 @@ def get_backlog_quotes(db: Session = Depends(get_db)):
             value = _line_item_backlog_value(li)
             backlog_total += value
 
-            backlog_lines.append(BacklogLineItem(
+            # model_construct: response_model re-validates the whole payload on
+            # the way out, so skip the duplicate validation while building it.
+            backlog_lines.append(BacklogLineItem.model_construct(
                 line_item_id=li.id,
                 item_type=li.item_type,
                 description=get_line_item_description(li, db),
@@ -93,7 +95,7 @@ def get_backlog_quotes(db: Session = Depends(get_db)):
             quote.current_version,
         )
 
-        result.append(BacklogQuoteItem(
+        result.append(BacklogQuoteItem.model_construct(
             quote_id=quote.id,
             quote_number=quote_number,
             uca_project_number=project.uca_project_number,
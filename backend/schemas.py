@@ -4,6 +4,11 @@ from datetime import datetime
 from enum import Enum
 
 
+def round_markup(cls, v: Optional[float]) -> Optional[float]:
+    """Shared input validator: markup percentages are stored to 2 decimal places."""
+    return round(v, 2) if v is not None else v
+
+
 class ProfileType(str, Enum):
     customer = "customer"
     vendor = "vendor"
@@ -179,6 +184,8 @@ class PartBase(BaseModel):
 class PartCreate(PartBase):
     linked_labor_ids: List[int] = []  # IDs of labor items to link
 
+    _round_markup = validator('markup_percent')(round_markup)
+
 
 class PartUpdate(BaseModel):
     part_number: Optional[str] = None
@@ -191,6 +198,8 @@ class PartUpdate(BaseModel):
     list_price: Optional[float] = None
     discount_percent: Optional[float] = None
 
+    _round_markup = validator('markup_percent')(round_markup)
+
 
 class Part(PartBase):
     id: int
@@ -219,7 +228,7 @@ class LaborBase(BaseModel):
 
 
 class LaborCreate(LaborBase):
-    pass
+    _round_markup = validator('markup_percent')(round_markup)
 
 
 class LaborUpdate(BaseModel):
@@ -229,6 +238,8 @@ class LaborUpdate(BaseModel):
     markup_percent: Optional[float] = None
     category_id: Optional[int] = None
 
+    _round_markup = validator('markup_percent')(round_markup)
+
     @validator('hours', pre=True)
     def hours_must_be_positive(cls, v) -> Optional[float]:
         if v is None:
@@ -258,7 +269,7 @@ class MiscellaneousBase(BaseModel):
 
 
 class MiscellaneousCreate(MiscellaneousBase):
-    pass
+    _round_markup = validator('markup_percent')(round_markup)
 
 
 class MiscellaneousUpdate(BaseModel):
@@ -267,6 +278,8 @@ class MiscellaneousUpdate(BaseModel):
     markup_percent: Optional[float] = None
     category_id: Optional[int] = None
 
+    _round_markup = validator('markup_percent')(round_markup)
+
 
 class Miscellaneous(MiscellaneousBase):
     id: int
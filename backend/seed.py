@@ -3,7 +3,7 @@ Database seeding for system items and company settings.
 Run this at application startup to ensure system items exist.
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import inspect as sa_inspect
+from sqlalchemy import select, func, and_
 from models import Miscellaneous, CompanySettings, SystemRate
 
 SYSTEM_MISC_ITEMS = [
@@ -70,11 +70,30 @@ DEFAULT_COMPANY_SETTINGS = {
 }
 
 
+def _already_seeded(db: Session) -> bool:
+    """Check, in one round trip, that every seed below is already in place."""
+    descriptions = [item["description"] for item in SYSTEM_MISC_ITEMS]
+    system_items = (
+        select(func.count(func.distinct(Miscellaneous.description)))
+        .where(Miscellaneous.is_system_item == True, Miscellaneous.description.in_(descriptions))
+        .scalar_subquery()
+    )
+    return db.execute(select(and_(
+        system_items == len(descriptions),
+        select(CompanySettings.id).where(CompanySettings.default_pms_percent.isnot(None)).exists(),
+        select(SystemRate.id).exists(),
+    ))).scalar()
+
+
 def seed_system_items(db: Session) -> None:
     """
     Seed system miscellaneous items and company settings if they don't exist.
     Called at application startup.
     """
+    # Every worker runs this on every boot; once seeded, one SELECT is all it costs
+    if _already_seeded(db):
+        return
+
     for item_data in SYSTEM_MISC_ITEMS:
         # Check if item already exists by description
         existing = db.query(Miscellaneous).filter(
@@ -87,51 +106,50 @@ def seed_system_items(db: Session) -> None:
             db.add(db_item)
 
     # Seed company settings (singleton)
-    existing_settings = db.query(CompanySettings).first()
-    if not existing_settings:
-        db.add(CompanySettings(**DEFAULT_COMPANY_SETTINGS))
-
-    db.commit()
+    settings = db.query(CompanySettings).first()
+    if not settings:
+        settings = CompanySettings(**DEFAULT_COMPANY_SETTINGS)
+        db.add(settings)
 
     # Seed default_pms_percent on company_settings if NULL
-    settings = db.query(CompanySettings).first()
-    if settings and settings.default_pms_percent is None:
+    if settings.default_pms_percent is None:
         settings.default_pms_percent = 10.0
-        db.commit()
 
-    # Seed system_rates from misc items (if table exists and is empty)
-    inspector = sa_inspect(db.bind)
-    if 'system_rates' in inspector.get_table_names():
-        existing_rates = db.query(SystemRate).count()
-        if existing_rates == 0:
-            # Map descriptions to (rate_type, sort_order)
-            rate_map = {
-                "Parking (1 Hour)": ("parking", 0),
-                "Travel Distance (40km) (1 Day)": ("travel_distance", 1),
-                "Travel Distance (60km) (1 Day)": ("travel_distance", 2),
-                "Travel Distance (80km) (1 Day)": ("travel_distance", 3),
-                "Travel Distance (120km) (1 Day)": ("travel_distance", 4),
-                "Travel Distance (180km) (1 Day)": ("travel_distance", 5),
-                "Travel Distance (260km) (1 Day)": ("travel_distance", 6),
-                "Unlimited Travel Distance (1 Day)": ("travel_distance", 7),
-            }
+    # Seed system_rates from misc items (if empty); the table is part of the
+    # ORM schema, so there is no need to reflect the database to find it
+    existing_rates = db.query(SystemRate).count()
+    if existing_rates == 0:
+        # Map descriptions to (rate_type, sort_order)
+        rate_map = {
+            "Parking (1 Hour)": ("parking", 0),
+            "Travel Distance (40km) (1 Day)": ("travel_distance", 1),
+            "Travel Distance (60km) (1 Day)": ("travel_distance", 2),
+            "Travel Distance (80km) (1 Day)": ("travel_distance", 3),
+            "Travel Distance (120km) (1 Day)": ("travel_distance", 4),
+            "Travel Distance (180km) (1 Day)": ("travel_distance", 5),
+            "Travel Distance (260km) (1 Day)": ("travel_distance", 6),
+            "Unlimited Travel Distance (1 Day)": ("travel_distance", 7),
+        }
 
-            misc_items = db.query(Miscellaneous).filter(
-                Miscellaneous.is_system_item == True
-            ).all()
+        # Assign ids to any misc items added above
+        db.flush()
+        misc_items = db.query(Miscellaneous).filter(
+            Miscellaneous.is_system_item == True
+        ).all()
 
-            for misc in misc_items:
-                mapping = rate_map.get(misc.description)
-                if mapping:
-                    rate_type, sort_order = mapping
-                    db.add(SystemRate(
-                        rate_type=rate_type,
-                        description=misc.description,
-                        unit_price=misc.unit_price,
-                        markup_percent=misc.markup_percent,
-                        sort_order=sort_order,
-                        is_active=True,
-                        linked_misc_id=misc.id,
-                    ))
+        for misc in misc_items:
+            mapping = rate_map.get(misc.description)
+            if mapping:
+                rate_type, sort_order = mapping
+                db.add(SystemRate(
+                    rate_type=rate_type,
+                    description=misc.description,
+                    unit_price=misc.unit_price,
+                    markup_percent=misc.markup_percent,
+                    sort_order=sort_order,
+                    is_active=True,
+                    linked_misc_id=misc.id,
+                ))
 
-            db.commit()
+    # Everything above lands in one transaction
+    db.commit()
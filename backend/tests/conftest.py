@@ -14,4 +14,5 @@ def _pg_reachable():
 # This prevents the ImportError from `from main import app` when
 # there's no local Postgres — while CI (which has Postgres) is unaffected.
 if not _pg_reachable():
-    collect_ignore = ["test_smoke.py", "test_backlog_report.py"]
+    collect_ignore = ["test_smoke.py", "test_backlog_report.py", "test_parts.py",
+                      "test_miscellaneous.py", "test_http_cache.py"]
@@ -0,0 +1,60 @@
+"""Tests for ETag / If-None-Match on the profile and project detail endpoints."""
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def project():
+    """A throwaway customer profile with one project, removed afterwards."""
+    r = client.post("/profiles/", json={
+        "name": "ETag Test Customer",
+        "type": "customer",
+        "pst": "PST-TEST",
+        "address": "1 Test St",
+        "postal_code": "A1A 1A1",
+        "contacts": [{"name": "Test Contact"}],
+    })
+    assert r.status_code == 200
+    profile_id = r.json()["id"]
+    r = client.post("/projects/", json={"name": "ETag Test Project", "customer_id": profile_id})
+    assert r.status_code == 200
+    project_id = r.json()["id"]
+    yield {"profile_id": profile_id, "project_id": project_id}
+    client.delete(f"/projects/{project_id}")
+    client.delete(f"/profiles/{profile_id}")
+
+
+@pytest.fixture(params=["profile", "project"])
+def detail_url(request, project):
+    if request.param == "profile":
+        return f"/profiles/{project['profile_id']}"
+    return f"/projects/{project['project_id']}"
+
+
+def test_get_returns_etag(detail_url):
+    r = client.get(detail_url)
+    assert r.status_code == 200
+    assert r.headers["etag"].startswith('W/"')
+    assert r.json()["id"]
+
+
+def test_matching_if_none_match_returns_304(detail_url):
+    etag = client.get(detail_url).headers["etag"]
+    r = client.get(detail_url, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["etag"] == etag
+
+
+def test_mismatched_if_none_match_returns_200(detail_url):
+    r = client.get(detail_url, headers={"If-None-Match": 'W/"not-the-current-tag"'})
+    assert r.status_code == 200
+    assert r.json()["id"]
+
+
+def test_wildcard_if_none_match_returns_304(detail_url):
+    r = client.get(detail_url, headers={"If-None-Match": "*"})
+    assert r.status_code == 304
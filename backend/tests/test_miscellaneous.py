@@ -0,0 +1,21 @@
+"""Tests for the miscellaneous item endpoints."""
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+
+def test_delete_system_item_is_forbidden():
+    """System items (seeded at startup) must not be deletable."""
+    r = client.get("/misc/")
+    assert r.status_code == 200
+    system_item = next(item for item in r.json() if item["is_system_item"])
+
+    r = client.delete(f"/misc/{system_item['id']}")
+    assert r.status_code == 403
+    assert client.get(f"/misc/{system_item['id']}").status_code == 200
+
+
+def test_delete_missing_item_returns_404():
+    r = client.delete("/misc/999999999")
+    assert r.status_code == 404
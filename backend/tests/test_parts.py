@@ -0,0 +1,25 @@
+"""Tests for the parts endpoints."""
+import uuid
+
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+
+def test_create_part_rejects_duplicate_part_number():
+    """A second POST with the same part_number should return 400, not 500."""
+    payload = {
+        "part_number": f"TEST-{uuid.uuid4().hex[:12]}",
+        "description": "Duplicate part number test",
+        "cost": 1.0,
+    }
+    r = client.post("/parts/", json=payload)
+    assert r.status_code == 200
+    part_id = r.json()["id"]
+    try:
+        r = client.post("/parts/", json=payload)
+        assert r.status_code == 400
+        assert r.json()["detail"] == "Part number already exists"
+    finally:
+        client.delete(f"/parts/{part_id}")